@@ -55,6 +55,97 @@ def build_coins_json(dst):
         json.dump(coins, f, indent=2, sort_keys=True)
 
     del sys.path[0]
+    return coins
+
+
+# coin fields in coins_index.json, see trezorlib/coins.py
+COINS_INDEX_FIELDS = (
+    "coin_name",
+    "coin_shortcut",
+    "slip44",
+    "address_type",
+    "address_type_p2sh",
+    "bip115",
+    "decred",
+    "blockbook",
+    "bitcore",
+)
+
+
+def build_coins_index(coins, dst):
+    index = {
+        "fields": COINS_INDEX_FIELDS,
+        "coins": [[coin[field] for field in COINS_INDEX_FIELDS] for coin in coins],
+    }
+    with open(dst, "w") as f:
+        json.dump(index, f, separators=(",", ":"))
+
+
+MESSAGES_INIT = """\
+# Automatically generated by setup.py prebuild, do not edit.
+#
+# Message classes and enums are imported from their modules on first access,
+# so that importing trezorlib does not import every message.
+
+import importlib
+import sys
+import types
+
+# wire type -> message name
+WIRE_TYPES = {wire_types}
+
+_NAMES = frozenset({names})
+
+
+class _LazyMessages(types.ModuleType):
+    def __getattr__(self, name):
+        if name not in _NAMES:
+            raise AttributeError(
+                "module '{{}}' has no attribute '{{}}'".format(__name__, name)
+            )
+        module = importlib.import_module("." + name, __name__)
+        setattr(self, name, module)
+        return self.__dict__[name]
+
+    def __setattr__(self, name, value):
+        # Importing a submodule sets it as an attribute of the package.
+        # Message modules define a class of the same name, enum modules do not.
+        if name in _NAMES and isinstance(value, types.ModuleType):
+            value = getattr(value, name, value)
+        super().__setattr__(name, value)
+
+    def __dir__(self):
+        return sorted(set(super().__dir__()) | _NAMES)
+
+
+sys.modules[__name__].__class__ = _LazyMessages
+"""
+
+
+def build_messages_init(messages_dir):
+    """Replace the generated messages/__init__.py with a lazily loading one."""
+    names = sorted(
+        os.path.splitext(os.path.basename(filename))[0]
+        for filename in glob.glob(os.path.join(messages_dir, "*.py"))
+        if not filename.endswith("__init__.py")
+    )
+    wire_types = {}
+    for line in read(messages_dir, "MessageType.py").splitlines():
+        match = re.match(r"^(\w+) = (\d+)$", line)
+        if match:
+            wire_types[int(match.group(2))] = match.group(1)
+
+    wire_types = "".join(
+        '    {}: "{}",\n'.format(wire_type, name)
+        for wire_type, name in sorted(wire_types.items())
+    )
+    names = "".join('    "{}",\n'.format(name) for name in names)
+    with open(os.path.join(messages_dir, "__init__.py"), "w") as f:
+        f.write(
+            MESSAGES_INIT.format(
+                wire_types="{\n" + wire_types + "}", names="(\n" + names + ")"
+            )
+        )
 
 
 class PrebuildCommand(Command):
@@ -76,11 +167,13 @@ class PrebuildCommand(Command):
                 + "Use 'git submodule update --init' to retrieve it."
             )
 
-        # generate and copy coins.json to the tree
+        # generate and copy coins.json and its index to the tree
         coins_json = os.path.join(CWD, "trezorlib", "coins.json")
-        build_coins_json(coins_json)
+        coins = build_coins_json(coins_json)
+        build_coins_index(coins, os.path.join(CWD, "trezorlib", "coins_index.json"))
 
         # regenerate messages
+        messages_dir = os.path.join(CWD, "trezorlib", "messages")
         try:
             proto_srcs = glob.glob(os.path.join(TREZOR_COMMON, "protob", "*.proto"))
             subprocess.check_call(
@@ -88,7 +181,7 @@ class PrebuildCommand(Command):
                     sys.executable,
                     os.path.join(TREZOR_COMMON, "protob", "pb2py"),
                     "-o",
-                    os.path.join(CWD, "trezorlib", "messages"),
+                    messages_dir,
                     "-P",
                     "..protobuf",
                 ]
@@ -98,6 +191,7 @@ class PrebuildCommand(Command):
             raise DistutilsError(
                 "Generating protobuf failed. Make sure you have 'protoc' in your PATH."
             ) from e
+        build_messages_init(messages_dir)
 
 
 def _patch_prebuild(cls):
@@ -126,7 +220,7 @@ setup(
     long_description_content_type="text/markdown",
     url="https://github.com/trezor/python-trezor",
     packages=find_packages(),
-    package_data={"trezorlib": ["coins.json"]},
+    package_data={"trezorlib": ["coins.json", "coins_index.json"]},
     scripts=["trezorctl"],
     install_requires=install_requires,
     extras_require={
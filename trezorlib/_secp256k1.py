@@ -0,0 +1,156 @@
+# This file is part of the Trezor project.
+#
+# Copyright (C) 2012-2018 SatoshiLabs and contributors
+#
+# This library is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3
+# as published by the Free Software Foundation.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the License along with this library.
+# If not, see <https://www.gnu.org/licenses/lgpl-3.0.html>.
+
+"""
+Public key arithmetic on the secp256k1 curve, y^2 = x^3 + 7.
+
+Affine points are (x, y) tuples.  Intermediate results use Jacobian
+coordinates (X, Y, Z), standing for (X / Z^2, Y / Z^3); Z == 0 is the point
+at infinity.  Multiples of the generator are computed from a table of
+precomputed affine points, one row per 8-bit window of the scalar, so a
+multiplication costs at most 32 point additions and no doublings.
+
+Nothing here is constant-time; it is meant for public data only.
+"""
+
+p = 2 ** 256 - 2 ** 32 - 977
+n = 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEBAAEDCE6AF48A03BBFD25E8CD0364141
+G = (
+    0x79BE667EF9DCBBAC55A06295CE870B07029BFCDB2DCE28D959F2815B16F81798,
+    0x483ADA7726A3C4655DA4FBFC0E1108A8FD17B448A68554199C47D08FFB10D4B8,
+)
+
+WINDOW = 8
+INFINITY = (1, 1, 0)
+
+_table = None
+
+
+def inv(x):
+    return pow(x, p - 2, p)
+
+
+def jacobian_double(P):
+    X, Y, Z = P
+    if not Y or not Z:
+        return INFINITY
+    YY = Y * Y % p
+    S = 4 * X * YY % p
+    M = 3 * X * X % p
+    X3 = (M * M - 2 * S) % p
+    Y3 = (M * (S - X3) - 8 * YY * YY) % p
+    Z3 = 2 * Y * Z % p
+    return (X3, Y3, Z3)
+
+
+def jacobian_add_affine(P, Q):
+    """Add affine point Q to Jacobian point P."""
+    X1, Y1, Z1 = P
+    x2, y2 = Q
+    if not Z1:
+        return (x2, y2, 1)
+    Z1Z1 = Z1 * Z1 % p
+    H = (x2 * Z1Z1 - X1) % p
+    r = (y2 * Z1 * Z1Z1 - Y1) % p
+    if not H:
+        if not r:
+            return jacobian_double(P)
+        return INFINITY
+    HH = H * H % p
+    HHH = H * HH % p
+    V = X1 * HH % p
+    X3 = (r * r - HHH - 2 * V) % p
+    Y3 = (r * (V - X3) - Y1 * HHH) % p
+    Z3 = Z1 * H % p
+    return (X3, Y3, Z3)
+
+
+def to_affine(P):
+    X, Y, Z = P
+    if not Z:
+        raise ValueError("Point at infinity")
+    zinv = inv(Z)
+    zinv2 = zinv * zinv % p
+    return (X * zinv2 % p, Y * zinv2 * zinv % p)
+
+
+def batch_to_affine(points):
+    """Convert Jacobian points to affine with a single field inversion."""
+    products = []
+    acc = 1
+    for _, _, Z in points:
+        if not Z:
+            raise ValueError("Point at infinity")
+        acc = acc * Z % p
+        products.append(acc)
+    acc = inv(acc)
+    result = [None] * len(points)
+    for i in range(len(points) - 1, -1, -1):
+        X, Y, Z = points[i]
+        zinv = acc * products[i - 1] % p if i else acc
+        acc = acc * Z % p
+        zinv2 = zinv * zinv % p
+        result[i] = (X * zinv2 % p, Y * zinv2 * zinv % p)
+    return result
+
+
+def _generator_table():
+    global _table
+    if _table is None:
+        table = []
+        base = G
+        for _ in range(256 // WINDOW):
+            multiples = [INFINITY]
+            for _ in range(1 << WINDOW):
+                multiples.append(jacobian_add_affine(multiples[-1], base))
+            # the last multiple is the base of the next window
+            affine = batch_to_affine(multiples[1:])
+            table.append([None] + affine[:-1])
+            base = affine[-1]
+        _table = table
+    return _table
+
+
+def multiply_generator(k):
+    """Return k * G in Jacobian coordinates."""
+    table = _generator_table()
+    mask = (1 << WINDOW) - 1
+    R = INFINITY
+    for row in table:
+        digit = k & mask
+        if digit:
+            R = jacobian_add_affine(R, row[digit])
+        k >>= WINDOW
+    return R
+
+
+def decompress(pubkey):
+    """Return the affine point of a compressed public key."""
+    if len(pubkey) != 33 or pubkey[0] not in (2, 3):
+        raise ValueError("Compressed pubkey expected")
+    x = int.from_bytes(pubkey[1:], "big")
+    alpha = (pow(x, 3, p) + 7) % p
+    y = pow(alpha, (p + 1) // 4, p)
+    if y * y % p != alpha:
+        raise ValueError("Point is not on the curve")
+    if (y & 1) != (pubkey[0] & 1):
+        y = p - y
+    return (x, y)
+
+
+def compress(point):
+    x, y = point
+    return bytes([2 + (y & 1)]) + x.to_bytes(32, "big")
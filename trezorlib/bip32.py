@@ -0,0 +1,158 @@
+# This file is part of the Trezor project.
+#
+# Copyright (C) 2012-2018 SatoshiLabs and contributors
+#
+# This library is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3
+# as published by the Free Software Foundation.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the License along with this library.
+# If not, see <https://www.gnu.org/licenses/lgpl-3.0.html>.
+
+"""
+BIP32 public key derivation, for watch-only wallets.
+
+Child public keys are derived locally from a node returned by
+`btc.get_public_node()` or from a serialized xpub, without talking to the
+device:
+
+    node = btc.get_public_node(client, parse_path("m/44h/0h/0h/0")).node
+    addresses = [get_address(child, 0) for child in derive_range(node, 0, 1000)]
+"""
+
+import hashlib
+import hmac
+import struct
+from functools import lru_cache
+from typing import List, Union
+
+from . import _secp256k1 as secp256k1, messages, tools
+
+XPUB_VERSION = 0x0488B21E
+
+Node = Union["messages.HDNodeType", str]
+
+
+@lru_cache(maxsize=256)
+def _point(pubkey: bytes):
+    return secp256k1.decompress(pubkey)
+
+
+@lru_cache(maxsize=256)
+def fingerprint(pubkey: bytes) -> int:
+    return struct.unpack(">I", tools.hash_160(pubkey)[:4])[0]
+
+
+def get_address(node: "messages.HDNodeType", address_type: int) -> str:
+    return tools.public_key_to_bc_address(node.public_key, address_type)
+
+
+def _to_node(node: Node) -> "messages.HDNodeType":
+    if isinstance(node, str):
+        return deserialize(node)
+    return node
+
+
+def _child_tweak(node: "messages.HDNodeType", i: int):
+    if i & tools.HARDENED_FLAG:
+        raise ValueError("Prime derivation not supported")
+    data = node.public_key + struct.pack(">L", i)
+    I64 = hmac.new(node.chain_code, data, hashlib.sha512).digest()
+    tweak = int.from_bytes(I64[:32], "big")
+    if tweak >= secp256k1.n:
+        raise ValueError("Invalid child index {}".format(i))
+    return tweak, I64[32:]
+
+
+def _child_point(node: "messages.HDNodeType", tweak: int):
+    point = secp256k1.jacobian_add_affine(
+        secp256k1.multiply_generator(tweak), _point(bytes(node.public_key))
+    )
+    if not point[2]:
+        raise ValueError("Point cannot be INFINITY")
+    return point
+
+
+def derive_range(node: Node, start: int, count: int) -> List["messages.HDNodeType"]:
+    """
+    Derive the children `start` .. `start + count - 1` of `node`, which is an
+    HDNodeType or a serialized xpub.
+    """
+    node = _to_node(node)
+    parent_fingerprint = fingerprint(bytes(node.public_key))
+    chain_codes = []
+    points = []
+    for i in range(start, start + count):
+        tweak, chain_code = _child_tweak(node, i)
+        chain_codes.append(chain_code)
+        points.append(_child_point(node, tweak))
+
+    children = []
+    for i, chain_code, point in zip(
+        range(start, start + count), chain_codes, secp256k1.batch_to_affine(points)
+    ):
+        children.append(
+            messages.HDNodeType(
+                depth=node.depth + 1,
+                fingerprint=parent_fingerprint,
+                child_num=i,
+                chain_code=chain_code,
+                public_key=secp256k1.compress(point),
+            )
+        )
+    return children
+
+
+def get_subnode(node: "messages.HDNodeType", i: int) -> "messages.HDNodeType":
+    return derive_range(node, i, 1)[0]
+
+
+def public_ckd(node: Node, n: List[int]) -> "messages.HDNodeType":
+    if not isinstance(n, list):
+        raise ValueError("Parameter must be a list")
+
+    node = _to_node(node)
+    for i in n:
+        node = get_subnode(node, i)
+    return node
+
+
+def serialize(node: "messages.HDNodeType", version: int = XPUB_VERSION) -> str:
+    s = b""
+    s += struct.pack(">I", version)
+    s += struct.pack(">B", node.depth)
+    s += struct.pack(">I", node.fingerprint)
+    s += struct.pack(">I", node.child_num)
+    s += node.chain_code
+    if node.private_key:
+        s += b"\x00" + node.private_key
+    else:
+        s += node.public_key
+    s += tools.btc_hash(s)[:4]
+    return tools.b58encode(s)
+
+
+def deserialize(xpub: str) -> "messages.HDNodeType":
+    data = tools.b58decode(xpub, None)
+
+    if tools.btc_hash(data[:-4])[:4] != data[-4:]:
+        raise ValueError("Checksum failed")
+
+    node = messages.HDNodeType()
+    node.depth = struct.unpack(">B", data[4:5])[0]
+    node.fingerprint = struct.unpack(">I", data[5:9])[0]
+    node.child_num = struct.unpack(">I", data[9:13])[0]
+    node.chain_code = data[13:45]
+
+    key = data[45:-4]
+    if key[0] == 0:
+        node.private_key = key[1:]
+    else:
+        node.public_key = key
+
+    return node
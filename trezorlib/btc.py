@@ -1,5 +1,50 @@
-from . import messages as proto
-from .tools import CallException, expect, normalize_nfc, session
+from collections import deque
+from io import BytesIO
+
+from . import exceptions, messages as proto, protobuf
+from .tools import CallException, expect, normalize_nfc, parse_path_range, session
+
+
+def _encode_public_key(resp):
+    data = BytesIO()
+    protobuf.dump_message(data, resp)
+    return data.getvalue()
+
+
+# results that can be kept in client.address_cache:
+# kind -> (response type, encode, decode)
+CACHED_RESULTS = {
+    "address": (
+        proto.Address,
+        lambda resp: resp.address.encode(),
+        lambda value: proto.Address(address=value.decode()),
+    ),
+    "public_node": (
+        proto.PublicKey,
+        _encode_public_key,
+        lambda value: protobuf.decode(value, proto.PublicKey),
+    ),
+}
+
+
+def _cache_key(client, kind, n, show_display, **kwargs):
+    cache = getattr(client, "address_cache", None)
+    if cache is None or show_display:
+        return None
+    return cache.key(client, kind, n, **kwargs)
+
+
+def _call_cached(client, kind, msg, key):
+    if key is None:
+        return client.call(msg)
+    expected, encode, decode = CACHED_RESULTS[kind]
+    value = client.address_cache.get(key)
+    if value is not None:
+        return decode(value)
+    resp = client.call(msg)
+    if isinstance(resp, expected):
+        client.address_cache.put(key, encode(resp))
+    return resp
 
 
 @expect(proto.PublicKey)
@@ -11,15 +56,23 @@ def get_public_node(
     coin_name=None,
     script_type=proto.InputScriptType.SPENDADDRESS,
 ):
-    return client.call(
-        proto.GetPublicKey(
-            address_n=n,
-            ecdsa_curve_name=ecdsa_curve_name,
-            show_display=show_display,
-            coin_name=coin_name,
-            script_type=script_type,
-        )
+    msg = proto.GetPublicKey(
+        address_n=n,
+        ecdsa_curve_name=ecdsa_curve_name,
+        show_display=show_display,
+        coin_name=coin_name,
+        script_type=script_type,
+    )
+    key = _cache_key(
+        client,
+        "public_node",
+        n,
+        show_display,
+        coin_name=coin_name,
+        script_type=script_type,
+        curve=ecdsa_curve_name,
     )
+    return _call_cached(client, "public_node", msg, key)
 
 
 @expect(proto.Address, field="address")
@@ -42,14 +95,210 @@ def get_address(
             )
         )
     else:
-        return client.call(
-            proto.GetAddress(
-                address_n=n,
+        msg = proto.GetAddress(
+            address_n=n,
+            coin_name=coin_name,
+            show_display=show_display,
+            script_type=script_type,
+        )
+        key = _cache_key(
+            client,
+            "address",
+            n,
+            show_display,
+            coin_name=coin_name,
+            script_type=script_type,
+        )
+        return _call_cached(client, "address", msg, key)
+
+
+def _expand_paths(paths):
+    if isinstance(paths, str):
+        paths = [paths]
+    for path in paths:
+        if isinstance(path, str):
+            yield from parse_path_range(path)
+        else:
+            yield path
+
+
+def _call_pipelined(client, msgs, expected, show_display=False):
+    """
+    Send all `msgs` in a single session and yield the responses in order.
+
+    The first message goes through `client.call()`, which takes care of PIN
+    and passphrase requests.  The others are written up to the transport's
+    PIPELINE_DEPTH ahead of reading their responses, which must be of the
+    `expected` type.  Messages that show something on the display are not
+    pipelined.
+    """
+    depth = 1 if show_display else client.transport.PIPELINE_DEPTH
+    msgs = iter(msgs)
+    first = next(msgs, None)
+    if first is None:
+        # nothing to send, e.g. all results were found in the cache
+        return
+    pending = 0
+
+    def check(resp):
+        if isinstance(resp, proto.Failure):
+            raise exceptions.TrezorFailure(resp)
+        if not isinstance(resp, expected):
+            raise RuntimeError("Got %s, expected %s" % (resp.__class__, expected))
+        return resp
+
+    client.session_begin()
+    try:
+        yield check(client.call(first))
+        if depth == 1:
+            for msg in msgs:
+                yield check(client.call(msg))
+        for msg in msgs:
+            client._raw_write(msg)
+            pending += 1
+            if pending == depth:
+                pending -= 1
+                yield check(client._raw_read())
+        while pending:
+            pending -= 1
+            yield check(client._raw_read())
+    finally:
+        # read the answers to messages that were already sent
+        try:
+            while pending:
+                pending -= 1
+                client._raw_read()
+        finally:
+            client.session_end()
+
+
+def _call_pipelined_cached(client, kind, requests, show_display):
+    """
+    `_call_pipelined` for (message, cache key) pairs.  Responses found in
+    the client's address cache are not requested from the device, and the
+    others are stored in the cache.
+    """
+    expected, encode, decode = CACHED_RESULTS[kind]
+    cache = client.address_cache
+    # (key, cached value) of every request, until its result is yielded
+    order = deque()
+
+    def misses():
+        for msg, key in requests:
+            value = cache.get(key) if key is not None else None
+            order.append((key, value))
+            if value is None:
+                yield msg
+
+    responses = _call_pipelined(client, misses(), expected, show_display)
+    try:
+        while True:
+            while order and order[0][1] is not None:
+                yield decode(order.popleft()[1])
+            try:
+                resp = next(responses)
+            except StopIteration:
+                break
+            # requests cached since the last miss come before its response
+            while order[0][1] is not None:
+                yield decode(order.popleft()[1])
+            key, _ = order.popleft()
+            if key is not None:
+                cache.put(key, encode(resp))
+            yield resp
+        for _, value in order:
+            yield decode(value)
+    finally:
+        responses.close()
+
+
+def get_addresses(
+    client,
+    coin_name,
+    paths,
+    show_display=False,
+    multisig=None,
+    script_type=proto.InputScriptType.SPENDADDRESS,
+):
+    """
+    Yield the addresses of all `paths`, in order, using a single session.
+
+    `paths` is a path string, which may contain ranges of indices (see
+    `tools.parse_path_range`), or an iterable of path strings and lists.
+    """
+    msgs = (
+        proto.GetAddress(
+            address_n=n,
+            coin_name=coin_name,
+            show_display=show_display,
+            multisig=multisig,
+            script_type=script_type,
+        )
+        for n in _expand_paths(paths)
+    )
+    if getattr(client, "address_cache", None) is None or multisig or show_display:
+        responses = _call_pipelined(client, msgs, proto.Address, show_display)
+    else:
+        requests = (
+            (
+                msg,
+                _cache_key(
+                    client,
+                    "address",
+                    msg.address_n,
+                    show_display,
+                    coin_name=coin_name,
+                    script_type=script_type,
+                ),
+            )
+            for msg in msgs
+        )
+        responses = _call_pipelined_cached(client, "address", requests, show_display)
+    for resp in responses:
+        yield resp.address
+
+
+def get_public_nodes(
+    client,
+    paths,
+    ecdsa_curve_name=None,
+    show_display=False,
+    coin_name=None,
+    script_type=proto.InputScriptType.SPENDADDRESS,
+):
+    """
+    Yield the PublicKey messages of all `paths`, in order, using a single
+    session.  `paths` are given as in `get_addresses`.
+    """
+    msgs = (
+        proto.GetPublicKey(
+            address_n=n,
+            ecdsa_curve_name=ecdsa_curve_name,
+            show_display=show_display,
+            coin_name=coin_name,
+            script_type=script_type,
+        )
+        for n in _expand_paths(paths)
+    )
+    if getattr(client, "address_cache", None) is None or show_display:
+        yield from _call_pipelined(client, msgs, proto.PublicKey, show_display)
+        return
+    requests = (
+        (
+            msg,
+            _cache_key(
+                client,
+                "public_node",
+                msg.address_n,
+                show_display,
                 coin_name=coin_name,
-                show_display=show_display,
                 script_type=script_type,
-            )
+                curve=ecdsa_curve_name,
+            ),
         )
+        for msg in msgs
+    )
+    yield from _call_pipelined_cached(client, "public_node", requests, show_display)
 
 
 @expect(proto.MessageSignature)
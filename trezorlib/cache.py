@@ -0,0 +1,160 @@
+# This file is part of the Trezor project.
+#
+# Copyright (C) 2012-2018 SatoshiLabs and contributors
+#
+# This library is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3
+# as published by the Free Software Foundation.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the License along with this library.
+# If not, see <https://www.gnu.org/licenses/lgpl-3.0.html>.
+
+"""
+Persistent cache of addresses and public keys received from devices.
+
+The cache is opt-in: pass an `AddressCache` to the client, and `btc`
+functions answer queries that do not show anything on the display from it:
+
+    cache = AddressCache("addresses.db")
+    client = TrezorClient(transport, ui=ui, address_cache=cache)
+"""
+
+import sqlite3
+import threading
+from typing import Optional, Sequence, Tuple
+
+# Number of entries kept; the least recently used ones are evicted
+MAX_ENTRIES = 100000
+# Number of new entries written to the file at once
+COMMIT_INTERVAL = 100
+
+Key = Tuple[str, str]
+
+
+class AddressCache:
+    """
+    Cache of public derivation results in an SQLite file, keyed by device ID,
+    passphrase state, coin, script type and path.
+
+    New entries are written to the file in batches of COMMIT_INTERVAL and on
+    `flush()` or `close()`.  Lookups only read the file; the use times they
+    record for evicting old entries are written together with new entries.
+    """
+
+    def __init__(self, filename: str, max_entries: int = MAX_ENTRIES) -> None:
+        self.db = sqlite3.connect(filename, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.max_entries = max_entries
+        self.pending = 0
+        self.touched = {}  # key -> last use, not written to the file yet
+        with self.lock, self.db:
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, device_id TEXT NOT NULL, "
+                "value BLOB NOT NULL, used INTEGER NOT NULL)"
+            )
+            self.db.execute(
+                "CREATE INDEX IF NOT EXISTS cache_device_id ON cache (device_id)"
+            )
+            self.db.execute("CREATE INDEX IF NOT EXISTS cache_used ON cache (used)")
+            self.counter = self.db.execute(
+                "SELECT COALESCE(MAX(used), 0) FROM cache"
+            ).fetchone()[0]
+
+    @staticmethod
+    def key(
+        client,
+        kind: str,
+        n: Sequence[int],
+        coin_name: str = None,
+        script_type: int = None,
+        curve: str = None,
+    ) -> Optional[Key]:
+        """
+        Cache key of a query made with `client`, or None if its results
+        cannot be cached, because the device has no ID or the passphrase
+        state is not known yet.
+        """
+        features = client.features
+        if not features.device_id:
+            return None
+        if features.passphrase_protection:
+            if client.state is None:
+                return None
+            state = client.state.hex()
+        else:
+            state = ""
+        key = "{}:{}:{}:{}:{}:{}:{}".format(
+            features.device_id,
+            state,
+            kind,
+            coin_name or "",
+            curve or "",
+            script_type if script_type is not None else "",
+            "/".join(str(i) for i in n),
+        )
+        return features.device_id, key
+
+    def get(self, key: Key) -> Optional[bytes]:
+        with self.lock:
+            row = self.db.execute(
+                "SELECT value FROM cache WHERE key = ?", (key[1],)
+            ).fetchone()
+            if row is None:
+                return None
+            # recorded in memory, so that lookups do not lock the file
+            self.counter += 1
+            self.touched[key[1]] = self.counter
+            return row[0]
+
+    def put(self, key: Key, value: bytes) -> None:
+        device_id, key = key
+        with self.lock:
+            self.counter += 1
+            self.touched.pop(key, None)
+            self.db.execute(
+                "INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?)",
+                (key, device_id, value, self.counter),
+            )
+            self.pending += 1
+            if self.pending >= COMMIT_INTERVAL:
+                self._commit()
+
+    def invalidate(self, device_id: str) -> None:
+        """Drop all entries of a device."""
+        with self.lock:
+            self.db.execute("DELETE FROM cache WHERE device_id = ?", (device_id,))
+            self._commit()
+
+    def flush(self) -> None:
+        with self.lock:
+            self._commit()
+
+    def close(self) -> None:
+        self.flush()
+        self.db.close()
+
+    def _commit(self):
+        if self.touched:
+            self.db.executemany(
+                "UPDATE cache SET used = ? WHERE key = ?",
+                ((used, key) for key, used in self.touched.items()),
+            )
+            self.touched = {}
+        excess = (
+            self.db.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+            - self.max_entries
+        )
+        if excess > 0:
+            self.db.execute(
+                "DELETE FROM cache WHERE key IN "
+                "(SELECT key FROM cache ORDER BY used LIMIT ?)",
+                (excess,),
+            )
+        self.db.commit()
+        self.pending = 0
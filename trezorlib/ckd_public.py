@@ -18,4 +18,7 @@ import warnings
 
 from .tests.support.ckd_public import *  # noqa
 
-warnings.warn("ckd_public module is deprecated and will be removed", DeprecationWarning)
+warnings.warn(
+    "ckd_public module is deprecated and will be removed, use bip32",
+    DeprecationWarning,
+)
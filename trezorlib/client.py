@@ -15,25 +15,14 @@
 # If not, see <https://www.gnu.org/licenses/lgpl-3.0.html>.
 
 import functools
+import importlib
 import logging
 import sys
+import threading
+import time
 import warnings
 
-from . import (
-    btc,
-    cosi,
-    device,
-    ethereum,
-    exceptions,
-    firmware,
-    lisk,
-    mapping,
-    messages as proto,
-    misc,
-    nem,
-    stellar,
-    tools,
-)
+from . import exceptions, mapping, messages as proto, tools
 
 if sys.version_info.major < 3:
     raise Exception("Trezorlib does not support Python 2 anymore.")
@@ -55,11 +44,25 @@ def get_buttonrequest_value(code):
 
 
 class MovedTo:
-    """Deprecation redirector for methods that were formerly part of TrezorClient"""
+    """Deprecation redirector for methods that were formerly part of TrezorClient
+
+    The new location is given as a "module.function" string relative to
+    trezorlib, and the module is only imported when the redirector is used.
+    """
 
     def __init__(self, where):
-        self.where = where
-        self.name = where.__module__ + "." + where.__name__
+        self.where = None
+        if callable(where):
+            self.where = where
+            self.name = where.__module__ + "." + where.__name__
+        else:
+            self.name = __package__ + "." + where
+
+    def _resolve(self):
+        if self.where is None:
+            module_name, func_name = self.name.rsplit(".", 1)
+            self.where = getattr(importlib.import_module(module_name), func_name)
+        return self.where
 
     def _deprecated_redirect(self, client, *args, **kwargs):
         """Redirector for a deprecated method on TrezorClient"""
@@ -68,7 +71,7 @@ class MovedTo:
             DeprecationWarning,
             stacklevel=2,
         )
-        return self.where(client, *args, **kwargs)
+        return self._resolve()(client, *args, **kwargs)
 
     def __get__(self, instance, cls):
         if instance is None:
@@ -80,14 +83,94 @@ class MovedTo:
 class BaseClient(object):
     # Implements very basic layer of sending raw protobuf
     # messages to device and getting its response back.
-    def __init__(self, transport, ui, **kwargs):
+    #
+    # With keep_open (or between open() and close(), or inside a `with`
+    # block), the transport session is held across calls instead of being
+    # opened and closed for every call.  If idle_timeout is set, the session
+    # is released after that many seconds without a call, and taken again by
+    # the next call.
+    def __init__(self, transport, ui, keep_open=False, idle_timeout=None, **kwargs):
         LOG.info("creating client instance for device: {}".format(transport.get_path()))
         self.transport = transport
         self.ui = ui
+        self.keep_open = False
+        self.idle_timeout = idle_timeout
+        self.session_held = False
+        self.active_calls = 0
+        self.last_activity = 0.0
+        self.idle_lock = threading.RLock()
+        self.idle_changed = threading.Condition(self.idle_lock)
+        self.idle_watcher = None
         super(BaseClient, self).__init__()  # *args, **kwargs)
+        if keep_open:
+            self.open()
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def open(self):
+        self.keep_open = True
+        self._hold_session()
 
     def close(self):
-        pass
+        self.keep_open = False
+        self._release_session()
+
+    def session_begin(self):
+        # Starts a call.  The transport session is taken under idle_lock, so
+        # that the idle watcher never releases it under a running call.
+        with self.idle_lock:
+            self.transport.session_begin()
+            self.active_calls += 1
+
+    def session_end(self):
+        with self.idle_lock:
+            self.active_calls -= 1
+            self.last_activity = time.monotonic()
+            self.transport.session_end()
+
+    def _hold_session(self):
+        with self.idle_lock:
+            if not self.session_held:
+                self.transport.session_begin()
+                self.session_held = True
+                self._start_idle_watcher()
+            self.last_activity = time.monotonic()
+
+    def _release_session(self):
+        with self.idle_lock:
+            self.idle_watcher = None
+            self.idle_changed.notify_all()
+            if self.session_held:
+                self.session_held = False
+                self.transport.session_end()
+
+    def _start_idle_watcher(self):
+        if self.idle_timeout is None:
+            return
+        self.idle_watcher = threading.Thread(
+            target=self._watch_idle, name="trezor-idle", daemon=True
+        )
+        self.idle_watcher.start()
+
+    def _watch_idle(self):
+        # One watcher runs while the session is held.  It exits when the
+        # session is released, by itself or by close().
+        with self.idle_lock:
+            while self.idle_watcher is threading.current_thread():
+                remaining = self.last_activity + self.idle_timeout - time.monotonic()
+                if self.active_calls:
+                    # a call is still running, e.g. waiting for the user
+                    remaining = self.idle_timeout
+                elif remaining <= 0:
+                    LOG.debug("releasing idle session")
+                    self._release_session()
+                    break
+                self.idle_changed.wait(remaining)
 
     def cancel(self):
         self._raw_write(proto.Cancel())
@@ -100,6 +183,8 @@ class BaseClient(object):
 
     def _raw_write(self, msg):
         __tracebackhide__ = True  # for pytest # pylint: disable=W0612
+        if self.keep_open:
+            self._hold_session()
         self.transport.write(msg)
 
     def _raw_read(self):
@@ -164,15 +249,21 @@ class BaseClient(object):
 class ProtocolMixin(object):
     VENDORS = ("bitcointrezor.com", "trezor.io")
 
-    def __init__(self, state=None, *args, **kwargs):
+    def __init__(self, state=None, address_cache=None, *args, **kwargs):
         super(ProtocolMixin, self).__init__(*args, **kwargs)
         self.state = state
+        self.address_cache = address_cache
         self.init_device()
         self.tx_api = None
 
     def set_tx_api(self, tx_api):
         self.tx_api = tx_api
 
+    def invalidate_address_cache(self):
+        """Drop cached addresses and public keys of the device, if any."""
+        if self.address_cache is not None and self.features.device_id:
+            self.address_cache.invalidate(self.features.device_id)
+
     def init_device(self):
         resp = self.call(proto.Initialize(state=self.state))
         if not isinstance(resp, proto.Features):
@@ -240,58 +331,58 @@ class ProtocolMixin(object):
         return self.call(proto.ClearSession())
 
     # Device functionality
-    wipe_device = MovedTo(device.wipe)
-    recovery_device = MovedTo(device.recover)
-    reset_device = MovedTo(device.reset)
-    backup_device = MovedTo(device.backup)
+    wipe_device = MovedTo("device.wipe")
+    recovery_device = MovedTo("device.recover")
+    reset_device = MovedTo("device.reset")
+    backup_device = MovedTo("device.backup")
 
-    set_u2f_counter = MovedTo(device.set_u2f_counter)
+    set_u2f_counter = MovedTo("device.set_u2f_counter")
 
-    apply_settings = MovedTo(device.apply_settings)
-    apply_flags = MovedTo(device.apply_flags)
-    change_pin = MovedTo(device.change_pin)
+    apply_settings = MovedTo("device.apply_settings")
+    apply_flags = MovedTo("device.apply_flags")
+    change_pin = MovedTo("device.change_pin")
 
     # Firmware functionality
-    firmware_update = MovedTo(firmware.update)
+    firmware_update = MovedTo("firmware.update")
 
     # BTC-like functionality
-    get_public_node = MovedTo(btc.get_public_node)
-    get_address = MovedTo(btc.get_address)
-    sign_tx = MovedTo(btc.sign_tx)
-    sign_message = MovedTo(btc.sign_message)
-    verify_message = MovedTo(btc.verify_message)
+    get_public_node = MovedTo("btc.get_public_node")
+    get_address = MovedTo("btc.get_address")
+    sign_tx = MovedTo("btc.sign_tx")
+    sign_message = MovedTo("btc.sign_message")
+    verify_message = MovedTo("btc.verify_message")
 
     # CoSi functionality
-    cosi_commit = MovedTo(cosi.commit)
-    cosi_sign = MovedTo(cosi.sign)
+    cosi_commit = MovedTo("cosi.commit")
+    cosi_sign = MovedTo("cosi.sign")
 
     # Ethereum functionality
-    ethereum_get_address = MovedTo(ethereum.get_address)
-    ethereum_sign_tx = MovedTo(ethereum.sign_tx)
-    ethereum_sign_message = MovedTo(ethereum.sign_message)
-    ethereum_verify_message = MovedTo(ethereum.verify_message)
+    ethereum_get_address = MovedTo("ethereum.get_address")
+    ethereum_sign_tx = MovedTo("ethereum.sign_tx")
+    ethereum_sign_message = MovedTo("ethereum.sign_message")
+    ethereum_verify_message = MovedTo("ethereum.verify_message")
 
     # Lisk functionality
-    lisk_get_address = MovedTo(lisk.get_address)
-    lisk_get_public_key = MovedTo(lisk.get_public_key)
-    lisk_sign_message = MovedTo(lisk.sign_message)
-    lisk_verify_message = MovedTo(lisk.verify_message)
-    lisk_sign_tx = MovedTo(lisk.sign_tx)
+    lisk_get_address = MovedTo("lisk.get_address")
+    lisk_get_public_key = MovedTo("lisk.get_public_key")
+    lisk_sign_message = MovedTo("lisk.sign_message")
+    lisk_verify_message = MovedTo("lisk.verify_message")
+    lisk_sign_tx = MovedTo("lisk.sign_tx")
 
     # NEM functionality
-    nem_get_address = MovedTo(nem.get_address)
-    nem_sign_tx = MovedTo(nem.sign_tx)
+    nem_get_address = MovedTo("nem.get_address")
+    nem_sign_tx = MovedTo("nem.sign_tx")
 
     # Stellar functionality
-    stellar_get_address = MovedTo(stellar.get_address)
-    stellar_sign_transaction = MovedTo(stellar.sign_tx)
+    stellar_get_address = MovedTo("stellar.get_address")
+    stellar_sign_transaction = MovedTo("stellar.sign_tx")
 
     # Miscellaneous cryptographic functionality
-    get_entropy = MovedTo(misc.get_entropy)
-    sign_identity = MovedTo(misc.sign_identity)
-    get_ecdh_session_key = MovedTo(misc.get_ecdh_session_key)
-    encrypt_keyvalue = MovedTo(misc.encrypt_keyvalue)
-    decrypt_keyvalue = MovedTo(misc.decrypt_keyvalue)
+    get_entropy = MovedTo("misc.get_entropy")
+    sign_identity = MovedTo("misc.sign_identity")
+    get_ecdh_session_key = MovedTo("misc.get_ecdh_session_key")
+    encrypt_keyvalue = MovedTo("misc.encrypt_keyvalue")
+    decrypt_keyvalue = MovedTo("misc.decrypt_keyvalue")
 
 
 class TrezorClient(ProtocolMixin, BaseClient):
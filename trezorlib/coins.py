@@ -16,25 +16,46 @@
 
 import json
 import os.path
-
-from .tx_api import TxApiInsight
+from collections.abc import Mapping
 
 COINS_JSON = os.path.join(os.path.dirname(__file__), "coins.json")
+COINS_INDEX_JSON = os.path.join(os.path.dirname(__file__), "coins_index.json")
 
 
 def _load_coins_json():
     # Load coins.json to local variables
+    # The registry is loaded on first use, so a missing or broken file is
+    # reported as RuntimeError by the first lookup, not when importing.
     # NOTE: coins.json comes from 'vendor/trezor-common/coins.json',
     # which is a git submodule. If you're trying to run trezorlib directly
     # from the checkout (or tarball), initialize the submodule with:
     # $ git submodule update --init
     # and install coins.json with:
     # $ python setup.py prebuild
-    with open(COINS_JSON) as coins_json:
-        return json.load(coins_json)
+    try:
+        with open(COINS_JSON) as coins_json:
+            return json.load(coins_json)
+    except Exception as e:
+        raise RuntimeError("Failed to load coins.json. Check your installation.") from e
+
+
+def _load_coins_index():
+    # coins_index.json is generated by 'setup.py prebuild' along with coins.json
+    # and only has the fields needed for lookups and TxApi construction.
+    try:
+        with open(COINS_INDEX_JSON) as index_json:
+            index = json.load(index_json)
+    except FileNotFoundError:
+        return _load_coins_json()
+    except Exception as e:
+        raise RuntimeError("Failed to load coins_index.json.") from e
+    fields = index["fields"]
+    return [dict(zip(fields, coin)) for coin in index["coins"]]
 
 
 def _insight_for_coin(coin):
+    from .tx_api import TxApiInsight
+
     url = next(iter(coin["blockbook"] + coin["bitcore"]), None)
     if not url:
         return None
@@ -47,18 +68,103 @@ def _insight_for_coin(coin):
     )
 
 
+class _CoinIndex:
+    """Lookup tables over the coin registry, from coin attributes to names."""
+
+    def __init__(self, coins_list):
+        self.coins = {}
+        self.by_shortcut = {}
+        self.by_slip44 = {}
+        self.by_address_type = {}
+        for coin in coins_list:
+            name = coin["coin_name"]
+            self.coins[name] = coin
+            self.by_shortcut[coin["coin_shortcut"]] = name
+            self.by_slip44.setdefault(coin["slip44"], []).append(name)
+            self.by_address_type.setdefault(coin["address_type"], []).append(name)
+
+
+_index = None
+
+
+def _get_index():
+    global _index
+    if _index is None:
+        _index = _CoinIndex(_load_coins_index())
+    return _index
+
+
+class _LazyMapping(Mapping):
+    """Read-only dict that is built on first use."""
+
+    def __init__(self, build):
+        self._build = build
+        self._data = None
+
+    def _get_data(self):
+        if self._data is None:
+            self._data = self._build()
+        return self._data
+
+    def __getitem__(self, key):
+        return self._get_data()[key]
+
+    def __iter__(self):
+        return iter(self._get_data())
+
+    def __len__(self):
+        return len(self._get_data())
+
+
+class _TxApiMapping(Mapping):
+    """Coin name -> `TxApiInsight`, constructed on first lookup of each coin."""
+
+    def __init__(self):
+        self._apis = {}
+
+    def _has_backend(self, coin):
+        return bool(coin["blockbook"] or coin["bitcore"])
+
+    def __getitem__(self, name):
+        try:
+            return self._apis[name]
+        except KeyError:
+            pass
+        coin = _get_index().coins[name]
+        if not self._has_backend(coin):
+            raise KeyError(name)
+        api = self._apis[name] = _insight_for_coin(coin)
+        return api
+
+    def __iter__(self):
+        coins = _get_index().coins
+        return (name for name, coin in coins.items() if self._has_backend(coin))
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
 # exported variables
-__all__ = ["by_name", "slip44", "tx_api"]
-
-try:
-    coins_list = _load_coins_json()
-    by_name = {coin["coin_name"]: coin for coin in coins_list}
-except Exception as e:
-    raise ImportError("Failed to load coins.json. Check your installation.") from e
-
-slip44 = {name: coin["slip44"] for name, coin in by_name.items()}
-tx_api = {
-    name: _insight_for_coin(coin)
-    for name, coin in by_name.items()
-    if coin["blockbook"] or coin["bitcore"]
-}
+__all__ = [
+    "by_name",
+    "by_shortcut",
+    "by_slip44",
+    "by_address_type",
+    "slip44",
+    "tx_api",
+]
+
+# coin name -> full coin info from coins.json
+by_name = _LazyMapping(lambda: {coin["coin_name"]: coin for coin in _load_coins_json()})
+# coin shortcut -> coin name
+by_shortcut = _LazyMapping(lambda: _get_index().by_shortcut)
+# slip44 id -> list of coin names
+by_slip44 = _LazyMapping(lambda: _get_index().by_slip44)
+# address type -> list of coin names
+by_address_type = _LazyMapping(lambda: _get_index().by_address_type)
+# coin name -> slip44 id
+slip44 = _LazyMapping(
+    lambda: {name: coin["slip44"] for name, coin in _get_index().coins.items()}
+)
+# coin name -> TxApiInsight, for coins with a blockbook or bitcore backend
+tx_api = _TxApiMapping()
@@ -275,11 +275,11 @@ class TrezorClientDebugLink(TrezorClient):
         output.append("Expected responses:")
         for i, exp in enumerate(self.expected_responses):
             prefix = "    " if i != self.current_response else ">>> "
-            set_fields = {
-                key: value
-                for key, value in exp.__dict__.items()
-                if value is not None and value != []
-            }
+            set_fields = {}
+            for key in exp:
+                value = getattr(exp, key)
+                if value is not None and value != []:
+                    set_fields[key] = value
             oneline_str = ", ".join("{}={!r}".format(*i) for i in set_fields.items())
             if len(oneline_str) < 60:
                 output.append(
@@ -314,7 +314,8 @@ class TrezorClientDebugLink(TrezorClient):
         if msg.__class__ != expected.__class__:
             self._raise_unexpected_response(msg)
 
-        for field, value in expected.__dict__.items():
+        for field in expected:
+            value = getattr(expected, field)
             if value is None or value == []:
                 continue
             if getattr(msg, field) != value:
@@ -373,6 +374,7 @@ def load_device_by_mnemonic(
         )
     )
     client.init_device()
+    client.invalidate_address_cache()
     return resp
 
 
@@ -423,6 +425,7 @@ def load_device_by_xprv(client, xprv, pin, passphrase_protection, label, languag
         )
     )
     client.init_device()
+    client.invalidate_address_cache()
     return resp
 
 
@@ -94,6 +94,7 @@ def set_u2f_counter(client, u2f_counter):
 
 @expect(proto.Success, field="message")
 def wipe(client):
+    client.invalidate_address_cache()
     ret = client.call(proto.WipeDevice())
     client.init_device()
     return ret
@@ -140,6 +141,8 @@ def recover(
             res = client.call(proto.Cancel())
 
     client.init_device()
+    if not dry_run:
+        client.invalidate_address_cache()
     return res
 
 
@@ -0,0 +1,116 @@
+# This file is part of the Trezor project.
+#
+# Copyright (C) 2012-2018 SatoshiLabs and contributors
+#
+# This library is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3
+# as published by the Free Software Foundation.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the License along with this library.
+# If not, see <https://www.gnu.org/licenses/lgpl-3.0.html>.
+
+from typing import Callable, Optional
+
+REPLEN = 64
+
+# Upper bound for the declared length of a received message, so that a corrupt
+# or hostile header cannot make us allocate an arbitrary amount of memory.
+MAX_MESSAGE_SIZE = 16 * 1024 * 1024
+
+_PADDING = bytes(REPLEN)
+
+
+class ReportWriter:
+    """
+    Writer that frames a stream of message data into fixed-size reports.
+
+    Every report starts with a header, which `pack_header(report, index)` packs
+    into the report buffer in place, returning its length.  `index` counts the
+    reports of the message from zero.  The rest of the report is filled with
+    data as it is written.  As soon as a report is full, it is passed to
+    `transport.write_chunk()`, so the serialized message never has to be held
+    in memory as a whole.  `close()` pads and sends the last report.
+
+    The same report buffer is used for all reports, so transports must not
+    keep a reference to it after `write_chunk()` returns.
+    """
+
+    def __init__(self, transport, pack_header: Callable[[bytearray, int], int]) -> None:
+        self.transport = transport
+        self.pack_header = pack_header
+        self.report = bytearray(REPLEN)
+        self.index = 0
+        self.offset = 0
+
+    def write(self, data: bytes) -> int:
+        data = memoryview(data)
+        length = len(data)
+        pos = 0
+        while pos < length:
+            if self.offset == 0:
+                self.offset = self.pack_header(self.report, self.index)
+            n = min(REPLEN - self.offset, length - pos)
+            self.report[self.offset : self.offset + n] = data[pos : pos + n]
+            self.offset += n
+            pos += n
+            if self.offset == REPLEN:
+                self._send()
+        return length
+
+    def close(self) -> None:
+        if self.offset:
+            self.report[self.offset :] = _PADDING[self.offset :]
+            self._send()
+
+    def _send(self) -> None:
+        self.transport.write_chunk(self.report)
+        self.index += 1
+        self.offset = 0
+
+
+def reassemble(
+    transport,
+    datalen: int,
+    data: bytes,
+    parse_next: Callable[[bytes], memoryview],
+    max_size: Optional[int] = None,
+) -> memoryview:
+    """
+    Collect `datalen` bytes of message data into a single buffer.
+
+    `data` is the part of the message that came in the first report.  The rest
+    is read with `transport.read_chunk()`, and `parse_next(chunk)` returns the
+    payload of every following report.  The buffer is allocated once, with the
+    declared length, and every payload is copied straight to its place.
+
+    Raises `RuntimeError` if `datalen` exceeds `max_size`, which defaults to
+    `MAX_MESSAGE_SIZE`.  The remaining reports of such a message are still
+    read and discarded, so that the next read starts with a new message.
+    """
+    if max_size is None:
+        max_size = MAX_MESSAGE_SIZE
+    if datalen > max_size:
+        offset = len(data)
+        while offset < datalen:
+            payload = parse_next(transport.read_chunk())
+            if not payload:
+                break
+            offset += len(payload)
+        raise RuntimeError(
+            "Message too long ({} bytes, limit is {})".format(datalen, max_size)
+        )
+
+    buffer = memoryview(bytearray(datalen))
+    offset = min(len(data), datalen)
+    buffer[:offset] = data[:offset]
+    while offset < datalen:
+        payload = parse_next(transport.read_chunk())
+        n = min(len(payload), datalen - offset)
+        buffer[offset : offset + n] = payload[:n]
+        offset += n
+    return buffer
@@ -1,6 +1,6 @@
 from . import messages as proto
 from .protobuf import dict_to_proto
-from .tools import CallException, dict_from_camelcase, expect, normalize_nfc
+from .tools import CallException, expect, normalize_nfc
 
 
 @expect(proto.LiskAddress, field="address")
@@ -37,6 +37,7 @@ RENAMES = {"lifetime": "life_time", "keysgroup": "keys_group"}
 
 @expect(proto.LiskSignedTx)
 def sign_tx(client, n, transaction):
-    transaction = dict_from_camelcase(transaction, renames=RENAMES)
-    msg = dict_to_proto(proto.LiskTransactionCommon, transaction)
+    msg = dict_to_proto(
+        proto.LiskTransactionCommon, transaction, camelcase=True, renames=RENAMES
+    )
     return client.call(proto.LiskSignTx(address_n=n, transaction=msg))
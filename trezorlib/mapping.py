@@ -19,44 +19,80 @@ from . import messages
 map_type_to_class = {}
 map_class_to_type = {}
 
+# wire type -> message name, for all generated messages
+_wire_types = None
 
-def build_map():
-    for msg_name in dir(messages.MessageType):
-        if msg_name.startswith("__"):
-            continue
 
+def _get_wire_types():
+    global _wire_types
+    if _wire_types is None:
         try:
-            msg_class = getattr(messages, msg_name)
+            # precomputed at generation time, see `setup.py prebuild`
+            _wire_types = messages.WIRE_TYPES
         except AttributeError:
-            raise ValueError(
-                "Implementation of protobuf message '%s' is missing" % msg_name
-            )
+            _wire_types = {
+                getattr(messages.MessageType, msg_name): msg_name
+                for msg_name in dir(messages.MessageType)
+                if not msg_name.startswith("__")
+            }
+    return _wire_types
+
+
+def _load_message(msg_name):
+    """Import a generated message class and register it."""
+    try:
+        msg_class = getattr(messages, msg_name)
+    except AttributeError:
+        raise ValueError(
+            "Implementation of protobuf message '%s' is missing" % msg_name
+        )
+
+    if _get_wire_types().get(msg_class.MESSAGE_WIRE_TYPE) != msg_name:
+        raise ValueError(
+            "Inconsistent wire type and MessageType record for '%s'" % msg_class
+        )
+
+    map_class_to_type[msg_class] = msg_class.MESSAGE_WIRE_TYPE
+    map_type_to_class[msg_class.MESSAGE_WIRE_TYPE] = msg_class
+    return msg_class
 
-        if msg_class.MESSAGE_WIRE_TYPE != getattr(messages.MessageType, msg_name):
-            raise ValueError(
-                "Inconsistent wire type and MessageType record for '%s'" % msg_class
-            )
 
-        register_message(msg_class)
+def build_map():
+    """Import and register all generated messages at once."""
+    for wire_type in _get_wire_types():
+        get_class(wire_type)
 
 
 def register_message(msg_class):
-    if msg_class.MESSAGE_WIRE_TYPE in map_type_to_class:
+    wire_type = msg_class.MESSAGE_WIRE_TYPE
+    if wire_type not in map_type_to_class and wire_type in _get_wire_types():
+        # the slot belongs to a generated message, which may not be loaded yet
+        _load_message(_get_wire_types()[wire_type])
+    if wire_type in map_type_to_class:
         raise Exception(
             "Message for wire type %s is already registered by %s"
-            % (msg_class.MESSAGE_WIRE_TYPE, get_class(msg_class.MESSAGE_WIRE_TYPE))
+            % (wire_type, get_class(wire_type))
         )
 
-    map_class_to_type[msg_class] = msg_class.MESSAGE_WIRE_TYPE
-    map_type_to_class[msg_class.MESSAGE_WIRE_TYPE] = msg_class
+    map_class_to_type[msg_class] = wire_type
+    map_type_to_class[wire_type] = msg_class
 
 
 def get_type(msg):
-    return map_class_to_type[msg.__class__]
+    try:
+        return map_class_to_type[msg.__class__]
+    except KeyError:
+        msg_name = _get_wire_types().get(getattr(msg, "MESSAGE_WIRE_TYPE", None))
+        if msg_name is None or getattr(messages, msg_name, None) is not msg.__class__:
+            raise
+        return _load_message(msg_name).MESSAGE_WIRE_TYPE
 
 
 def get_class(t):
-    return map_type_to_class[t]
-
-
-build_map()
+    try:
+        return map_type_to_class[t]
+    except KeyError:
+        msg_name = _get_wire_types().get(t)
+        if msg_name is None:
+            raise
+        return _load_message(msg_name)
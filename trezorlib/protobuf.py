@@ -35,10 +35,14 @@ required:
 >>>         """
 >>>         Writes all bytes from `buffer`, or raises `EOFError`.
 >>>         """
+
+When the whole serialized message is already in memory, `decode()` parses it
+directly from a bytes-like object, without the `Reader` indirection.
 '''
 
-from io import BytesIO
-from typing import Any, Optional
+import re
+from operator import attrgetter
+from typing import Any, Dict, Optional, Type
 
 _UVARINT_BUFFER = bytearray(1)
 
@@ -57,16 +61,45 @@ def load_uvarint(reader):
     return result
 
 
+def _decode_uvarint(buffer, offset):
+    result = 0
+    shift = 0
+    try:
+        while True:
+            byte = buffer[offset]
+            offset += 1
+            result += (byte & 0x7F) << shift
+            if not byte & 0x80:
+                return result, offset
+            shift += 7
+    except IndexError:
+        raise EOFError from None
+
+
 def dump_uvarint(writer, n):
+    writer.write(_uvarint_bytes(n))
+
+
+_SMALL_UVARINTS = [bytes((i,)) for i in range(0x80)]
+
+
+def _uvarint_bytes(n):
     if n < 0:
         raise ValueError("Cannot dump signed value, convert it to unsigned first.")
-    buffer = _UVARINT_BUFFER
-    shifted = True
-    while shifted:
-        shifted = n >> 7
-        buffer[0] = (n & 0x7F) | (0x80 if shifted else 0x00)
-        writer.write(buffer)
-        n = shifted
+    if n < 0x80:
+        return _SMALL_UVARINTS[n]
+    buffer = bytearray()
+    while n >= 0x80:
+        buffer.append((n & 0x7F) | 0x80)
+        n >>= 7
+    buffer.append(n)
+    return bytes(buffer)
+
+
+def _uvarint_size(n):
+    if n < 0:
+        raise ValueError("Cannot dump signed value, convert it to unsigned first.")
+    return (n.bit_length() + 6) // 7 or 1
 
 
 # protobuf interleaved signed encoding:
@@ -124,9 +157,55 @@ class UnicodeType:
     WIRE_TYPE = 2
 
 
-class MessageType:
+class _MessageTypeMeta(type):
+    """
+    Metaclass that gives every `MessageType` subclass `__slots__` for the
+    fields declared by its `get_fields()`.
+
+    Generated constructors assign every field, so a generated message fills
+    all of its slots.  Messages created by `decode()` or by the keyword
+    constructor of `MessageType` leave unassigned fields empty, and reading
+    them falls through to `MessageType.__getattr__`, which supplies the
+    defaults.
+
+    `MessageType` itself keeps a `__dict__` slot, so every message still
+    accepts attributes that are not fields; the dict is only allocated when
+    such an attribute is set.  If `get_fields()` cannot be evaluated when the
+    class is created (for example because the schema refers to the class
+    itself), the fields are stored in that dict instead of in slots.
+    """
+
+    def __new__(mcs, name, bases, namespace, **kwargs):
+        if "__slots__" not in namespace:
+            namespace["__slots__"] = _field_slots(bases, namespace)
+        return super().__new__(mcs, name, bases, namespace, **kwargs)
+
+
+def _field_slots(bases, namespace):
+    get_fields = namespace.get("get_fields")
+    if get_fields is None:
+        return ()
+    try:
+        fields = get_fields.__func__(None)
+    except Exception:
+        return ()
+
+    inherited = set()
+    for base in bases:
+        for cls in base.__mro__:
+            inherited.update(getattr(cls, "__slots__", ()))
+    return tuple(
+        fname
+        for fname, _, _ in fields.values()
+        if fname not in inherited and fname not in namespace
+    )
+
+
+class MessageType(metaclass=_MessageTypeMeta):
     WIRE_TYPE = 2
 
+    __slots__ = ("_size_cache", "_lazy", "__dict__")
+
     @classmethod
     def get_fields(cls):
         return {}
@@ -134,23 +213,39 @@ class MessageType:
     def __init__(self, **kwargs):
         for kw in kwargs:
             setattr(self, kw, kwargs[kw])
-        self._fill_missing()
 
     def __eq__(self, rhs):
-        return self.__class__ is rhs.__class__ and self.__dict__ == rhs.__dict__
+        return self.__class__ is rhs.__class__ and all(
+            getattr(self, fname) == getattr(rhs, fname) for fname in self
+        )
 
     def __repr__(self):
         d = {}
-        for key, value in self.__dict__.items():
+        for key in self:
+            value = getattr(self, key)
             if value is None or value == []:
                 continue
             d[key] = value
         return "<%s: %s>" % (self.__class__.__name__, d)
 
     def __iter__(self):
-        return self.__dict__.__iter__()
+        return iter(_get_codec(self.__class__).repeated)
 
     def __getattr__(self, attr):
+        codec = _get_codec(self.__class__)
+        repeated = codec.repeated.get(attr)
+        if repeated is not None:
+            # field that was never assigned, or was not decoded yet
+            try:
+                return codec.load_lazy(self, attr)
+            except (AttributeError, KeyError):
+                pass
+            if not repeated:
+                return None
+            value = []
+            setattr(self, attr, value)
+            return value
+
         if attr.startswith("_add_"):
             return self._additem(attr[5:])
 
@@ -179,12 +274,7 @@ class MessageType:
             if not (v[2] & FLAG_REPEATED):
                 raise AttributeError
 
-            try:
-                l = getattr(self, v[0])
-            except AttributeError:
-                l = []
-                setattr(self, v[0], l)
-
+            l = getattr(self, v[0])
             item = v[1]()
             l.append(item)
             return lambda: item
@@ -193,20 +283,27 @@ class MessageType:
 
     def _fill_missing(self):
         # fill missing fields
-        for fname, ftype, fflags in self.get_fields().values():
-            if not hasattr(self, fname):
-                if fflags & FLAG_REPEATED:
-                    setattr(self, fname, [])
-                else:
-                    setattr(self, fname, None)
+        for fname in self:
+            getattr(self, fname)
 
     def CopyFrom(self, obj):
-        self.__dict__ = obj.__dict__.copy()
+        for fname in obj:
+            setattr(self, fname, getattr(obj, fname))
 
     def ByteSize(self):
-        data = BytesIO()
-        dump_message(data, self)
-        return len(data.getvalue())
+        """
+        Return the length of the serialized message.
+
+        The size is computed without serializing, and is cached on this message
+        and all its embedded messages.  A cached size is reused only while the
+        fields it was computed from, including the contents of repeated fields
+        and the sizes of embedded messages, stay the same.
+
+        Checking that still walks every field of the message tree, so a call
+        costs time proportional to the size of the tree even when the cached
+        size is reused; what it saves is measuring the values and their keys.
+        """
+        return _get_codec(self.__class__).cached_size(self)
 
 
 class LimitedReader:
@@ -234,116 +331,508 @@ class CountingWriter:
 
 
 FLAG_REPEATED = 1
+FLAG_PACKED = 2
+
+
+class _MessageCodec:
+    """
+    Encoder and decoder specialized for a single `MessageType` subclass.
+
+    The schema returned by `get_fields()` is interpreted once, when the codec
+    is built, into per-field tables of handler functions and pre-encoded field
+    keys.  Codecs are built on first use and cached in `_CODECS`.
+
+    Sizes of embedded messages are needed for their length prefixes.  They are
+    computed by `size()` and memoized in a `_SizeMemo` that lives for the
+    duration of a single `dump_message()` call, so every embedded message is
+    measured once and serialized once.
+
+    `cached_size()` keeps the size on the message itself, together with the
+    state it was computed from: the values of scalar fields (lengths, for bytes
+    fields) and the sizes of embedded messages.  The stored size is reused as
+    long as the state is unchanged, so assignments as well as in-place changes
+    anywhere in the message tree are noticed.  Building and comparing the state
+    visits the whole tree on every call; only the measuring is skipped.
+
+    Repeated varint fields are always accepted in packed encoding, and are
+    written packed if the schema marks them with `FLAG_PACKED`.
+    """
+
+    def __init__(self, msg_type):
+        self.msg_type = msg_type
+        self.repeated = {}  # field name -> is repeated, in schema order
+        self.embedded = {}  # field name -> message type, for embedded messages
+        self.decoders = {}
+        self.encoders = []
+        self.measures = []
+        for ftag, (fname, ftype, fflags) in msg_type.get_fields().items():
+            repeated = bool(fflags & FLAG_REPEATED)
+            self.repeated[fname] = repeated
+            if isinstance(ftype, type) and issubclass(ftype, MessageType):
+                self.embedded[fname] = ftype
+            fkey = _uvarint_bytes((ftag << 3) | ftype.WIRE_TYPE)
+            fconvert, fdump, fsize = _field_handlers(ftype)
+            self.decoders[ftag] = (fname, ftype.WIRE_TYPE, fconvert, repeated)
+            if repeated and fflags & FLAG_PACKED and ftype.WIRE_TYPE == 0:
+                # the packed handlers write the field key themselves
+                fdump, fsize = _packed_handlers(ftag, ftype)
+                self.encoders.append((fname, b"", fdump, fsize, False))
+                self.measures.append((fname, tuple, 0, _measure_with(fsize), False))
+                continue
+            self.encoders.append((fname, fkey, fdump, fsize, repeated))
+            if fname in self.embedded:
+                fstate, fmeasure = _cached_message_size, _measure_length_prefixed
+            elif ftype is BytesType:
+                fstate, fmeasure = len, _measure_length_prefixed
+            else:
+                fstate, fmeasure = _unchanged_value, _measure_with(fsize)
+            self.measures.append((fname, fstate, len(fkey), fmeasure, repeated))
 
+        self.get_values = _values_getter([m[0] for m in self.measures])
+        self.transforms = [
+            (i, None if fstate is _unchanged_value else fstate, repeated)
+            for i, (_, fstate, _, _, repeated) in enumerate(self.measures)
+            if fstate is not _unchanged_value or repeated
+        ]
 
-def load_message(reader, msg_type):
-    fields = msg_type.get_fields()
-    msg = msg_type()
+    def load(self, reader):
+        msg = self.msg_type()
+        decoders = self.decoders
+
+        while True:
+            try:
+                fkey = load_uvarint(reader)
+            except EOFError:
+                break  # no more fields to load
+
+            wtype = fkey & 7
+            field = decoders.get(fkey >> 3)
+
+            if field is None:  # unknown field, skip it
+                if wtype == 0:
+                    load_uvarint(reader)
+                elif wtype == 2:
+                    ivalue = load_uvarint(reader)
+                    reader.readinto(bytearray(ivalue))
+                else:
+                    raise ValueError
+                continue
 
-    while True:
-        try:
-            fkey = load_uvarint(reader)
-        except EOFError:
-            break  # no more fields to load
+            fname, fwire, fconvert, repeated = field
+            if wtype != fwire and not (repeated and fwire == 0 and wtype == 2):
+                raise TypeError  # parsed wire type differs from the schema
 
-        ftag = fkey >> 3
-        wtype = fkey & 7
+            ivalue = load_uvarint(reader)
+            if wtype == 2:
+                buf = bytearray(ivalue)
+                reader.readinto(buf)
+                if fwire == 0:  # packed repeated varints
+                    getattr(msg, fname).extend(_decode_packed(buf, fconvert))
+                    continue
+                fvalue = fconvert(memoryview(buf), False)
+            else:
+                fvalue = fconvert(ivalue)
 
-        field = fields.get(ftag, None)
+            if repeated:
+                getattr(msg, fname).append(fvalue)
+            else:
+                setattr(msg, fname, fvalue)
+
+        return msg
+
+    def decode(self, buffer, zero_copy, lazy=False):
+        msg = self.msg_type()
+        decoders = self.decoders
+        embedded = self.embedded
+        raw = {}
+        offset = 0
+        end = len(buffer)
+
+        while offset < end:
+            fkey = buffer[offset]
+            if fkey & 0x80:
+                fkey, offset = _decode_uvarint(buffer, offset)
+            else:
+                offset += 1
 
-        if field is None:  # unknown field, skip it
+            wtype = fkey & 7
             if wtype == 0:
-                load_uvarint(reader)
+                if offset < end and buffer[offset] < 0x80:
+                    ivalue = buffer[offset]
+                    offset += 1
+                else:
+                    ivalue, offset = _decode_uvarint(buffer, offset)
             elif wtype == 2:
-                ivalue = load_uvarint(reader)
-                reader.readinto(bytearray(ivalue))
+                ivalue, offset = _decode_uvarint(buffer, offset)
+                if offset + ivalue > end:
+                    raise EOFError
             else:
                 raise ValueError
-            continue
-
-        fname, ftype, fflags = field
-        if wtype != ftype.WIRE_TYPE:
-            raise TypeError  # parsed wire type differs from the schema
-
-        ivalue = load_uvarint(reader)
-
-        if ftype is UVarintType:
-            fvalue = ivalue
-        elif ftype is SVarintType:
-            fvalue = uint_to_sint(ivalue)
-        elif ftype is BoolType:
-            fvalue = bool(ivalue)
-        elif ftype is BytesType:
-            buf = bytearray(ivalue)
-            reader.readinto(buf)
-            fvalue = bytes(buf)
-        elif ftype is UnicodeType:
-            buf = bytearray(ivalue)
-            reader.readinto(buf)
-            fvalue = buf.decode()
-        elif issubclass(ftype, MessageType):
-            fvalue = load_message(LimitedReader(reader, ivalue), ftype)
-        else:
-            raise TypeError  # field type is unknown
 
-        if fflags & FLAG_REPEATED:
-            pvalue = getattr(msg, fname)
-            pvalue.append(fvalue)
-            fvalue = pvalue
+            field = decoders.get(fkey >> 3)
+            if field is None:  # unknown field, skip it
+                if wtype == 2:
+                    offset += ivalue
+                continue
+
+            fname, fwire, fconvert, repeated = field
+            if wtype != fwire and not (repeated and fwire == 0 and wtype == 2):
+                raise TypeError  # parsed wire type differs from the schema
+
+            if wtype == 2:
+                fbuffer = buffer[offset : offset + ivalue]
+                offset += ivalue
+                if fwire == 0:  # packed repeated varints
+                    getattr(msg, fname).extend(_decode_packed(fbuffer, fconvert))
+                    continue
+                if lazy and fname in embedded:
+                    # keep the payload, decode on first access
+                    if not zero_copy:
+                        fbuffer = bytes(fbuffer)
+                    if repeated:
+                        raw.setdefault(fname, []).append(fbuffer)
+                    else:
+                        raw[fname] = fbuffer
+                    continue
+                fvalue = fconvert(fbuffer, zero_copy)
+            else:
+                fvalue = fconvert(ivalue)
+
+            if repeated:
+                getattr(msg, fname).append(fvalue)
+            else:
+                setattr(msg, fname, fvalue)
+
+        if raw:
+            for fname in raw:
+                try:
+                    # drop the default set by a generated constructor,
+                    # so that reading the field ends up in __getattr__
+                    object.__delattr__(msg, fname)
+                except AttributeError:
+                    pass
+            msg._lazy = raw
+        return msg
+
+    def load_lazy(self, msg, fname):
+        """Decode a lazily loaded field of `msg`, or raise `KeyError`."""
+        fraw = msg._lazy.pop(fname)
+        codec = _get_codec(self.embedded[fname])
+        if self.repeated[fname]:
+            fvalue = [codec.decode(b, isinstance(b, memoryview), True) for b in fraw]
+        else:
+            fvalue = codec.decode(fraw, isinstance(fraw, memoryview), True)
         setattr(msg, fname, fvalue)
+        return fvalue
+
+    def dump(self, writer, msg, sizes):
+        for fname, fkey, fdump, _, repeated in self.encoders:
+            fvalue = getattr(msg, fname, None)
+            if fvalue is None:
+                continue
+            if not repeated:
+                fvalue = (fvalue,)
+            for svalue in fvalue:
+                writer.write(fkey)
+                fdump(writer, svalue, sizes)
+
+    def size(self, msg, sizes):
+        total = sizes.get(msg)
+        if total is not None:
+            return total
+
+        total = 0
+        for fname, fkey, _, fsize, repeated in self.encoders:
+            fvalue = getattr(msg, fname, None)
+            if fvalue is None:
+                continue
+            if not repeated:
+                fvalue = (fvalue,)
+            for svalue in fvalue:
+                total += len(fkey) + fsize(svalue, sizes)
+
+        sizes.put(msg, total)
+        return total
+
+    def cached_size(self, msg):
+        state = self.get_values(msg)
+        if self.transforms:
+            state = list(state)
+            for i, fstate, repeated in self.transforms:
+                fvalue = state[i]
+                if fvalue is None:
+                    continue
+                if fstate is None:
+                    state[i] = tuple(fvalue)
+                elif repeated:
+                    state[i] = tuple(map(fstate, fvalue))
+                else:
+                    state[i] = fstate(fvalue)
+            state = tuple(state)
 
-    return msg
+        cache = getattr(msg, "_size_cache", None)
+        if cache is not None and cache[0] == state:
+            return cache[1]
 
+        total = 0
+        for (_, _, keylen, fmeasure, repeated), fvalue in zip(self.measures, state):
+            if fvalue is None:
+                continue
+            if not repeated:
+                fvalue = (fvalue,)
+            for svalue in fvalue:
+                total += keylen + fmeasure(svalue)
 
-def dump_message(writer, msg):
-    repvalue = [0]
-    mtype = msg.__class__
-    fields = mtype.get_fields()
+        msg._size_cache = (state, total)
+        return total
 
-    for ftag in fields:
-        fname, ftype, fflags = fields[ftag]
 
-        fvalue = getattr(msg, fname, None)
-        if fvalue is None:
-            continue
+class _SizeMemo:
+    """Sizes of messages measured during a single serialization."""
 
-        fkey = (ftag << 3) | ftype.WIRE_TYPE
+    def __init__(self):
+        self.sizes = {}
 
-        if not fflags & FLAG_REPEATED:
-            repvalue[0] = fvalue
-            fvalue = repvalue
+    def get(self, msg):
+        return self.sizes.get(id(msg))
 
-        for svalue in fvalue:
-            dump_uvarint(writer, fkey)
+    def put(self, msg, size):
+        self.sizes[id(msg)] = size
 
-            if ftype is UVarintType:
-                dump_uvarint(writer, svalue)
 
-            elif ftype is SVarintType:
-                dump_uvarint(writer, sint_to_uint(svalue))
+_CODECS = {}  # type: Dict[Type[MessageType], _MessageCodec]
 
-            elif ftype is BoolType:
-                dump_uvarint(writer, int(svalue))
 
-            elif ftype is BytesType:
-                dump_uvarint(writer, len(svalue))
-                writer.write(svalue)
+def _get_codec(msg_type):
+    try:
+        return _CODECS[msg_type]
+    except KeyError:
+        codec = _CODECS[msg_type] = _MessageCodec(msg_type)
+        return codec
 
-            elif ftype is UnicodeType:
-                if not isinstance(svalue, bytes):
-                    svalue = svalue.encode()
 
-                dump_uvarint(writer, len(svalue))
-                writer.write(svalue)
+def _field_handlers(ftype):
+    """
+    Return a `(convert, dump, size)` triple of functions for a field type.
 
-            elif issubclass(ftype, MessageType):
-                counter = CountingWriter()
-                dump_message(counter, svalue)
-                dump_uvarint(writer, counter.size)
-                dump_message(writer, svalue)
+    For varint types, `convert(ivalue)` turns the decoded varint into the field
+    value.  For length-delimited types, `convert(buffer, zero_copy)` turns the
+    payload, a bytes-like object, into the field value.  `dump(writer, value,
+    sizes)` writes everything that follows the field key and `size(value,
+    sizes)` returns its length.
+    """
+    if ftype is UVarintType:
+        return _convert_uvarint_field, _dump_uvarint_field, _size_uvarint_field
+    if ftype is SVarintType:
+        return uint_to_sint, _dump_svarint_field, _size_svarint_field
+    if ftype is BoolType:
+        return bool, _dump_bool_field, _size_bool_field
+    if ftype is BytesType:
+        return _convert_bytes_field, _dump_bytes_field, _size_bytes_field
+    if ftype is UnicodeType:
+        return _convert_unicode_field, _dump_unicode_field, _size_unicode_field
+    if isinstance(ftype, type) and issubclass(ftype, MessageType):
+
+        def convert_message_field(buffer, zero_copy):
+            return _get_codec(ftype).decode(buffer, zero_copy)
+
+        return convert_message_field, _dump_message_field, _size_message_field
+
+    def unknown_type(*args):
+        raise TypeError  # field type is unknown
+
+    return unknown_type, unknown_type, unknown_type
+
+
+def _packed_handlers(ftag, ftype):
+    """
+    Return a `(dump, size)` pair for a packed repeated varint field.
+
+    Unlike the handlers from `_field_handlers`, these take the whole sequence
+    of values, which may also be an `array`, and include the field key, which
+    is omitted together with the rest of the field if the sequence is empty.
+    """
+    fkey = _uvarint_bytes((ftag << 3) | 2)
+    if ftype is SVarintType:
+        encode, measure = _encode_svarint, _measure_svarint
+    elif ftype is BoolType:
+        encode, measure = _encode_bool, _measure_bool
+    else:
+        encode, measure = _uvarint_bytes, _uvarint_size
+
+    def dump_packed_field(writer, fvalue, sizes):
+        if not len(fvalue):
+            return
+        data = b"".join(map(encode, fvalue))
+        writer.write(fkey + _uvarint_bytes(len(data)) + data)
+
+    def size_packed_field(fvalue, sizes):
+        if not len(fvalue):
+            return 0
+        length = sum(map(measure, fvalue))
+        return len(fkey) + _uvarint_size(length) + length
+
+    return dump_packed_field, size_packed_field
+
+
+def _encode_svarint(svalue):
+    return _uvarint_bytes(sint_to_uint(svalue))
+
+
+def _measure_svarint(svalue):
+    return _uvarint_size(sint_to_uint(svalue))
+
+
+def _encode_bool(svalue):
+    return b"\x01" if svalue else b"\x00"
+
+
+def _measure_bool(svalue):
+    return 1
+
+
+def _decode_packed(buffer, fconvert):
+    values = []
+    offset = 0
+    end = len(buffer)
+    while offset < end:
+        ivalue, offset = _decode_uvarint(buffer, offset)
+        values.append(fconvert(ivalue))
+    return values
+
+
+def _convert_uvarint_field(ivalue):
+    return ivalue
+
+
+def _convert_bytes_field(buffer, zero_copy):
+    if zero_copy:
+        return buffer
+    return bytes(buffer)
 
-            else:
-                raise TypeError
+
+def _convert_unicode_field(buffer, zero_copy):
+    return str(buffer, "utf-8")
+
+
+def _dump_uvarint_field(writer, svalue, sizes):
+    writer.write(_uvarint_bytes(svalue))
+
+
+def _dump_svarint_field(writer, svalue, sizes):
+    writer.write(_uvarint_bytes(sint_to_uint(svalue)))
+
+
+def _dump_bool_field(writer, svalue, sizes):
+    writer.write(_uvarint_bytes(int(svalue)))
+
+
+def _dump_bytes_field(writer, svalue, sizes):
+    writer.write(_uvarint_bytes(len(svalue)))
+    writer.write(svalue)
+
+
+def _dump_unicode_field(writer, svalue, sizes):
+    if not isinstance(svalue, bytes):
+        svalue = svalue.encode()
+    writer.write(_uvarint_bytes(len(svalue)))
+    writer.write(svalue)
+
+
+def _dump_message_field(writer, svalue, sizes):
+    codec = _get_codec(svalue.__class__)
+    writer.write(_uvarint_bytes(codec.size(svalue, sizes)))
+    codec.dump(writer, svalue, sizes)
+
+
+def _size_uvarint_field(svalue, sizes):
+    return _uvarint_size(svalue)
+
+
+def _size_svarint_field(svalue, sizes):
+    return _uvarint_size(sint_to_uint(svalue))
+
+
+def _size_bool_field(svalue, sizes):
+    return _uvarint_size(int(svalue))
+
+
+def _size_bytes_field(svalue, sizes):
+    return _uvarint_size(len(svalue)) + len(svalue)
+
+
+def _size_unicode_field(svalue, sizes):
+    if not isinstance(svalue, bytes):
+        svalue = svalue.encode()
+    return _uvarint_size(len(svalue)) + len(svalue)
+
+
+def _size_message_field(svalue, sizes):
+    size = _get_codec(svalue.__class__).size(svalue, sizes)
+    return _uvarint_size(size) + size
+
+
+def _values_getter(fnames):
+    """Return a function that reads the fields `fnames` of a message as a tuple."""
+    if len(fnames) == 1:
+        getter = attrgetter(fnames[0])
+        return lambda msg: (getter(msg),)
+    if not fnames:
+        return lambda msg: ()
+    return attrgetter(*fnames)
+
+
+def _cached_message_size(svalue):
+    return _get_codec(svalue.__class__).cached_size(svalue)
+
+
+def _measure_length_prefixed(length):
+    return _uvarint_size(length) + length
+
+
+def _measure_with(fsize):
+    def measure(svalue):
+        return fsize(svalue, None)
+
+    return measure
+
+
+def load_message(reader, msg_type):
+    return _get_codec(msg_type).load(reader)
+
+
+def dump_message(writer, msg):
+    _get_codec(msg.__class__).dump(writer, msg, _SizeMemo())
+
+
+def message_size(msg):
+    """Return the length of the serialized `msg`, without serializing it."""
+    return _get_codec(msg.__class__).size(msg, _SizeMemo())
+
+
+# Default for the `lazy` argument of `decode()`.
+LAZY_DECODE = False
+
+
+def decode(buffer, msg_type, zero_copy=False, lazy=None):
+    """
+    Decode a message of type `msg_type` from a bytes-like object.
+
+    The buffer is walked by offset through a `memoryview`, so embedded messages
+    are parsed in place.  Bytes fields are returned as `bytes` copies, or, with
+    `zero_copy=True`, as `memoryview` slices of `buffer`.  Such slices keep
+    `buffer` alive and see any later changes to its contents.
+
+    With `lazy=True`, embedded messages are not decoded up front.  Their
+    serialized form is kept on the message, and each one is decoded (lazily as
+    well) the first time its field is read.  If `lazy` is not given, the
+    module-level `LAZY_DECODE` setting is used, which also applies to messages
+    received by the protocol and bridge transports.
+    """
+    if lazy is None:
+        lazy = LAZY_DECODE
+    buffer = memoryview(buffer).cast("B")
+    return _get_codec(msg_type).decode(buffer, zero_copy, lazy)
 
 
 def format_message(
@@ -398,52 +887,185 @@ def format_message(
     return "{name} ({size} bytes) {content}".format(
         name=pb.__class__.__name__,
         size=pb.ByteSize(),
-        content=pformat_value(pb.__dict__, indent),
+        content=pformat_value({key: getattr(pb, key) for key in pb}, indent),
     )
 
 
+def _bytes_from_value(value):
+    if isinstance(value, str):
+        return bytes.fromhex(value)
+    elif isinstance(value, bytes):
+        return value
+    else:
+        raise TypeError("can't convert {} value to bytes".format(type(value)))
+
+
+def _bytes_to_value(value):
+    return bytes(value).hex()
+
+
+def _unchanged_value(value):
+    return value
+
+
+def _unknown_value(value):
+    raise TypeError  # field type is unknown
+
+
+_VALUE_TO_PROTO = {
+    UVarintType: int,
+    SVarintType: int,
+    BoolType: bool,
+    UnicodeType: str,
+    BytesType: _bytes_from_value,
+}
+
+_VALUE_FROM_PROTO = {BytesType: _bytes_to_value}
+
+
 def value_to_proto(ftype, value):
     if issubclass(ftype, MessageType):
         raise TypeError("value_to_proto only converts simple values")
 
-    if ftype in (UVarintType, SVarintType):
-        return int(value)
+    try:
+        convert = _VALUE_TO_PROTO[ftype]
+    except KeyError:
+        raise TypeError("unknown field type {}".format(ftype)) from None
+    return convert(value)
 
-    if ftype is BoolType:
-        return bool(value)
 
-    if ftype is UnicodeType:
-        return str(value)
+# de-camelcasifier
+# https://stackoverflow.com/a/1176023/222189
 
-    if ftype is BytesType:
-        if isinstance(value, str):
-            return bytes.fromhex(value)
-        elif isinstance(value, bytes):
-            return value
-        else:
-            raise TypeError("can't convert {} value to bytes".format(type(value)))
+FIRST_CAP_RE = re.compile("(.)([A-Z][a-z]+)")
+ALL_CAP_RE = re.compile("([a-z0-9])([A-Z])")
 
 
-def dict_to_proto(message_type, d):
-    params = {}
-    for fname, ftype, fflags in message_type.get_fields().values():
-        repeated = fflags & FLAG_REPEATED
-        value = d.get(fname)
-        if value is None:
-            continue
+def from_camelcase(s):
+    s = FIRST_CAP_RE.sub(r"\1_\2", s)
+    return ALL_CAP_RE.sub(r"\1_\2", s).lower()
 
-        if not repeated:
-            value = [value]
 
-        if issubclass(ftype, MessageType):
-            function = dict_to_proto
-        else:
-            function = value_to_proto
+_CAMELCASE_KEYS = {}  # type: Dict[str, str]
+
+
+def _key_from_camelcase(key, renames):
+    try:
+        newkey = _CAMELCASE_KEYS[key]
+    except KeyError:
+        newkey = _CAMELCASE_KEYS[key] = from_camelcase(key)
+    if renames:
+        return renames.get(newkey) or renames.get(key) or newkey
+    return newkey
+
+
+def _key_to_camelcase(fname):
+    first, *rest = fname.split("_")
+    return first + "".join(part.capitalize() for part in rest)
+
+
+class _DictConverter:
+    """
+    Precompiled conversion between a message type and plain dicts.
+
+    Every field gets a `(fname, camelcase_name, repeated, embedded, to_proto,
+    from_proto)` entry, where `embedded` is the message type of embedded
+    message fields (None otherwise), and `to_proto` / `from_proto` convert
+    a single simple value.
+    """
+
+    __slots__ = ("msg_type", "fields")
+
+    def __init__(self, msg_type):
+        self.msg_type = msg_type
+        self.fields = []
+        for fname, ftype, fflags in msg_type.get_fields().values():
+            repeated = bool(fflags & FLAG_REPEATED)
+            if isinstance(ftype, type) and issubclass(ftype, MessageType):
+                embedded, to_proto, from_proto = ftype, None, None
+            else:
+                embedded = None
+                to_proto = _VALUE_TO_PROTO.get(ftype, _unknown_value)
+                from_proto = _VALUE_FROM_PROTO.get(ftype, _unchanged_value)
+            self.fields.append(
+                (
+                    fname,
+                    _key_to_camelcase(fname),
+                    repeated,
+                    embedded,
+                    to_proto,
+                    from_proto,
+                )
+            )
+
+    def to_proto(self, d, camelcase, renames):
+        if camelcase:
+            d = {_key_from_camelcase(key, renames): value for key, value in d.items()}
+        params = {}
+        for fname, _, repeated, embedded, to_proto, _ in self.fields:
+            value = d.get(fname)
+            if value is None:
+                continue
+            if embedded is not None:
+                converter = _get_dict_converter(embedded)
+                if repeated:
+                    value = [converter.to_proto(v, camelcase, renames) for v in value]
+                else:
+                    value = converter.to_proto(value, camelcase, renames)
+            elif repeated:
+                value = [to_proto(v) for v in value]
+            else:
+                value = to_proto(value)
+            params[fname] = value
+        return self.msg_type(**params)
+
+    def from_proto(self, msg, camelcase):
+        res = {}
+        for fname, cname, repeated, embedded, _, from_proto in self.fields:
+            value = getattr(msg, fname)
+            if value is None or (repeated and not value):
+                continue
+            if embedded is not None:
+                converter = _get_dict_converter(embedded)
+                if repeated:
+                    value = [converter.from_proto(v, camelcase) for v in value]
+                else:
+                    value = converter.from_proto(value, camelcase)
+            elif repeated:
+                value = [from_proto(v) for v in value]
+            else:
+                value = from_proto(value)
+            res[cname if camelcase else fname] = value
+        return res
+
+
+_DICT_CONVERTERS = {}  # type: Dict[Type[MessageType], _DictConverter]
+
+
+def _get_dict_converter(msg_type):
+    try:
+        return _DICT_CONVERTERS[msg_type]
+    except KeyError:
+        converter = _DICT_CONVERTERS[msg_type] = _DictConverter(msg_type)
+        return converter
+
+
+def dict_to_proto(message_type, d, camelcase=False, renames=None):
+    """
+    Build a `message_type` instance from a dict, recursively.
 
-        newvalue = [function(ftype, v) for v in value]
+    With `camelcase`, keys of `d` and of every nested dict are expected in
+    camelCase (or PascalCase) and are mapped to field names the same way as
+    `tools.dict_from_camelcase(d, renames)` does.  Bytes fields accept hex
+    strings.
+    """
+    return _get_dict_converter(message_type).to_proto(d, camelcase, renames)
 
-        if not repeated:
-            newvalue = newvalue[0]
 
-        params[fname] = newvalue
-    return message_type(**params)
+def proto_to_dict(msg, camelcase=False):
+    """
+    Convert a message to a dict, recursively.  This is the reverse of
+    `dict_to_proto`: unset fields are left out, bytes are hex-encoded and with
+    `camelcase`, keys are converted to camelCase.
+    """
+    return _get_dict_converter(msg.__class__).from_proto(msg, camelcase)
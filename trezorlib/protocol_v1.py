@@ -16,18 +16,27 @@
 
 import logging
 import struct
-from io import BytesIO
 from typing import Tuple
 
 from . import mapping, protobuf
+from .framing import MAX_MESSAGE_SIZE, ReportWriter, reassemble
 from .transport import Transport
 
-REPLEN = 64
-
 LOG = logging.getLogger(__name__)
 
+# message type, data length
+MESSAGE_HEADER = struct.Struct(">HL")
+
+
+def _pack_report_header(report: bytearray, index: int) -> int:
+    report[0] = 0x3F  # "?"
+    return 1
+
 
 class ProtocolV1:
+    # Longest message accepted by `read()`; longer ones raise `RuntimeError`
+    max_message_size = MAX_MESSAGE_SIZE
+
     def session_begin(self, transport: Transport) -> None:
         pass
 
@@ -39,18 +48,13 @@ class ProtocolV1:
             "sending message: {}".format(msg.__class__.__name__),
             extra={"protobuf": msg},
         )
-        data = BytesIO()
-        protobuf.dump_message(data, msg)
-        ser = data.getvalue()
-        header = struct.pack(">HL", mapping.get_type(msg), len(ser))
-        data = bytearray(b"##" + header + ser)
-
-        while data:
-            # Report ID, data padded to 63 bytes
-            chunk = b"?" + data[: REPLEN - 1]
-            chunk = chunk.ljust(REPLEN, b"\x00")
-            transport.write_chunk(chunk)
-            data = data[63:]
+        header = MESSAGE_HEADER.pack(mapping.get_type(msg), protobuf.message_size(msg))
+
+        # Report ID, data padded to 63 bytes
+        writer = ReportWriter(transport, _pack_report_header)
+        writer.write(b"##" + header)
+        protobuf.dump_message(writer, msg)
+        writer.close()
 
     def read(self, transport: Transport) -> protobuf.MessageType:
         # Read header with first part of message data
@@ -58,34 +62,30 @@ class ProtocolV1:
         msg_type, datalen, data = self.parse_first(chunk)
 
         # Read the rest of the message
-        while len(data) < datalen:
-            chunk = transport.read_chunk()
-            data.extend(self.parse_next(chunk))
-
-        # Strip padding
-        data = BytesIO(data[:datalen])
+        data = reassemble(
+            transport, datalen, data, self.parse_next, self.max_message_size
+        )
 
         # Parse to protobuf
-        msg = protobuf.load_message(data, mapping.get_class(msg_type))
+        msg = protobuf.decode(data, mapping.get_class(msg_type))
         LOG.debug(
             "received message: {}".format(msg.__class__.__name__),
             extra={"protobuf": msg},
         )
         return msg
 
-    def parse_first(self, chunk: bytes) -> Tuple[int, int, bytes]:
+    def parse_first(self, chunk: bytes) -> Tuple[int, int, memoryview]:
         if chunk[:3] != b"?##":
             raise RuntimeError("Unexpected magic characters")
         try:
-            headerlen = struct.calcsize(">HL")
-            msg_type, datalen = struct.unpack(">HL", chunk[3 : 3 + headerlen])
+            msg_type, datalen = MESSAGE_HEADER.unpack_from(chunk, 3)
         except Exception:
             raise RuntimeError("Cannot parse header")
 
-        data = chunk[3 + headerlen :]
+        data = memoryview(chunk)[3 + MESSAGE_HEADER.size :]
         return msg_type, datalen, data
 
-    def parse_next(self, chunk: bytes) -> bytes:
+    def parse_next(self, chunk: bytes) -> memoryview:
         if chunk[:1] != b"?":
             raise RuntimeError("Unexpected magic characters")
-        return chunk[1:]
+        return memoryview(chunk)[1:]
@@ -16,27 +16,142 @@
 
 import logging
 import struct
-from io import BytesIO
-from typing import Tuple
+import threading
+from collections import deque
+from typing import Deque, Dict, Optional, Set, Tuple
 
 from . import mapping, protobuf
+from .framing import MAX_MESSAGE_SIZE, REPLEN, ReportWriter, reassemble
 from .transport import Transport
 
-REPLEN = 64
-
 LOG = logging.getLogger(__name__)
 
+# magic, session id
+FIRST_REPORT_HEADER = struct.Struct(">BL")
+# magic, session id, sequence number
+NEXT_REPORT_HEADER = struct.Struct(">BLL")
+# message type, data length
+MESSAGE_HEADER = struct.Struct(">LL")
+SESSION_ID = struct.Struct(">L")
+
+
+class SessionDemultiplexer:
+    """
+    Routes reports read from one device handle to the sessions they belong to.
+
+    Several `ProtocolV2` sessions can share a device handle and be used from
+    different threads at once.  At any time, only one of the threads reads
+    from the device.  It keeps the reports addressed to its own session and
+    puts all other reports in the queues of their sessions, where the other
+    threads pick them up.
+
+    Responses to session open and close requests carry no usable session id,
+    so these requests are serialized and their responses are routed to the
+    `CONTROL` queue.
+
+    Writes are serialized by `write_lock`, which is held for a whole message.
+    Reports for sessions that were not registered, or were already discarded,
+    are dropped instead of being queued.
+    """
+
+    CONTROL = None
 
-class ProtocolV2:
     def __init__(self) -> None:
+        self.control_lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.cond = threading.Condition()
+        self.queues = {}  # type: Dict[Optional[int], Deque[bytes]]
+        self.sessions = set()  # type: Set[int]
+        self.reading = False
+
+    def route(self, chunk: bytes) -> Optional[int]:
+        """Return the session a report is addressed to."""
+        if chunk[0] in (0x01, 0x02) and len(chunk) >= 5:
+            return SESSION_ID.unpack_from(chunk, 1)[0]
+        return self.CONTROL
+
+    def read_chunk(self, transport: Transport, session: Optional[int]) -> bytes:
+        with self.cond:
+            while True:
+                queue = self.queues.get(session)
+                if queue:
+                    return queue.popleft()
+                if not self.reading:
+                    self.reading = True
+                    break
+                self.cond.wait()
+
+        try:
+            while True:
+                chunk = transport.read_chunk()
+                target = self.route(chunk)
+                if target == session:
+                    return chunk
+                with self.cond:
+                    if target != self.CONTROL and target not in self.sessions:
+                        LOG.warning(
+                            "dropping report for unknown session {}".format(target)
+                        )
+                        continue
+                    self.queues.setdefault(target, deque()).append(chunk)
+                    self.cond.notify_all()
+        finally:
+            with self.cond:
+                self.reading = False
+                self.cond.notify_all()
+
+    def register(self, session: int) -> None:
+        """Start keeping reports for an opened session."""
+        with self.cond:
+            self.sessions.add(session)
+
+    def discard(self, session: int) -> None:
+        """Drop reports left over for a closed session."""
+        with self.cond:
+            self.sessions.discard(session)
+            self.queues.pop(session, None)
+
+
+class _SessionReader:
+    """Transport-like reader of the reports for one session."""
+
+    __slots__ = ("demux", "transport", "session")
+
+    def __init__(self, demux, transport, session):
+        self.demux = demux
+        self.transport = transport
+        self.session = session
+
+    def read_chunk(self) -> bytes:
+        return self.demux.read_chunk(self.transport, self.session)
+
+
+class ProtocolV2:
+    """
+    Version 2 of the wire protocol, with numbered sessions.
+
+    Protocols that share a device handle must also share a
+    `SessionDemultiplexer`, passed as `demux`.
+    """
+
+    # Longest message accepted by `read()`; longer ones raise `RuntimeError`
+    max_message_size = MAX_MESSAGE_SIZE
+
+    def __init__(self, demux: Optional[SessionDemultiplexer] = None) -> None:
         self.session = None
+        if demux is None:
+            demux = SessionDemultiplexer()
+        self.demux = demux
 
     def session_begin(self, transport: Transport) -> None:
         chunk = struct.pack(">B", 0x03)
         chunk = chunk.ljust(REPLEN, b"\x00")
-        transport.write_chunk(chunk)
-        resp = transport.read_chunk()
+        with self.demux.control_lock:
+            with self.demux.write_lock:
+                transport.write_chunk(chunk)
+            resp = self.demux.read_chunk(transport, self.demux.CONTROL)
         self.session = self.parse_session_open(resp)
+        self.demux.register(self.session)
         LOG.debug("[session {}] session started".format(self.session))
 
     def session_end(self, transport: Transport) -> None:
@@ -44,11 +159,14 @@ class ProtocolV2:
             return
         chunk = struct.pack(">BL", 0x04, self.session)
         chunk = chunk.ljust(REPLEN, b"\x00")
-        transport.write_chunk(chunk)
-        resp = transport.read_chunk()
+        with self.demux.control_lock:
+            with self.demux.write_lock:
+                transport.write_chunk(chunk)
+            resp = self.demux.read_chunk(transport, self.demux.CONTROL)
         (magic,) = struct.unpack(">B", resp[:1])
         if magic != 0x04:
             raise RuntimeError("Expected session close")
+        self.demux.discard(self.session)
         LOG.debug("[session {}] session ended".format(self.session))
         self.session = None
 
@@ -62,46 +180,40 @@ class ProtocolV2:
             ),
             extra={"protobuf": msg},
         )
-        # Serialize whole message
-        data = BytesIO()
-        protobuf.dump_message(data, msg)
-        data = data.getvalue()
-        dataheader = struct.pack(">LL", mapping.get_type(msg), len(data))
-        data = dataheader + data
-        seq = -1
-
-        # Write it out
-        while data:
-            if seq < 0:
-                repheader = struct.pack(">BL", 0x01, self.session)
-            else:
-                repheader = struct.pack(">BLL", 0x02, self.session, seq)
-            datalen = REPLEN - len(repheader)
-            chunk = repheader + data[:datalen]
-            chunk = chunk.ljust(REPLEN, b"\x00")
-            transport.write_chunk(chunk)
-            data = data[datalen:]
-            seq += 1
+
+        session = self.session
+
+        def pack_header(report, index):
+            if index == 0:
+                FIRST_REPORT_HEADER.pack_into(report, 0, 0x01, session)
+                return FIRST_REPORT_HEADER.size
+            NEXT_REPORT_HEADER.pack_into(report, 0, 0x02, session, index - 1)
+            return NEXT_REPORT_HEADER.size
+
+        # Serialize the message straight into reports
+        writer = ReportWriter(transport, pack_header)
+        header = MESSAGE_HEADER.pack(mapping.get_type(msg), protobuf.message_size(msg))
+        with self.demux.write_lock:
+            writer.write(header)
+            protobuf.dump_message(writer, msg)
+            writer.close()
 
     def read(self, transport: Transport) -> protobuf.MessageType:
         if not self.session:
             raise RuntimeError("Missing session for v2 protocol")
 
         # Read header with first part of message data
-        chunk = transport.read_chunk()
+        reader = _SessionReader(self.demux, transport, self.session)
+        chunk = reader.read_chunk()
         msg_type, datalen, data = self.parse_first(chunk)
 
         # Read the rest of the message
-        while len(data) < datalen:
-            chunk = transport.read_chunk()
-            next_data = self.parse_next(chunk)
-            data.extend(next_data)
-
-        # Strip padding
-        data = BytesIO(data[:datalen])
+        data = reassemble(
+            reader, datalen, data, self.parse_next, self.max_message_size
+        )
 
         # Parse to protobuf
-        msg = protobuf.load_message(data, mapping.get_class(msg_type))
+        msg = protobuf.decode(data, mapping.get_class(msg_type))
         LOG.debug(
             "[session {}] received message: {}".format(
                 self.session, msg.__class__.__name__
@@ -110,7 +222,7 @@ class ProtocolV2:
         )
         return msg
 
-    def parse_first(self, chunk: bytes) -> Tuple[int, int, bytes]:
+    def parse_first(self, chunk: bytes) -> Tuple[int, int, memoryview]:
         try:
             headerlen = struct.calcsize(">BLLL")
             magic, session, msg_type, datalen = struct.unpack(
@@ -122,9 +234,9 @@ class ProtocolV2:
             raise RuntimeError("Unexpected magic character")
         if session != self.session:
             raise RuntimeError("Session id mismatch")
-        return msg_type, datalen, chunk[headerlen:]
+        return msg_type, datalen, memoryview(chunk)[headerlen:]
 
-    def parse_next(self, chunk: bytes) -> bytes:
+    def parse_next(self, chunk: bytes) -> memoryview:
         try:
             headerlen = struct.calcsize(">BLL")
             magic, session, sequence = struct.unpack(">BLL", chunk[:headerlen])
@@ -134,7 +246,7 @@ class ProtocolV2:
             raise RuntimeError("Unexpected magic characters")
         if session != self.session:
             raise RuntimeError("Session id mismatch")
-        return chunk[headerlen:]
+        return memoryview(chunk)[headerlen:]
 
     def parse_session_open(self, chunk: bytes) -> int:
         try:
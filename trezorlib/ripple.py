@@ -17,7 +17,7 @@
 
 from . import messages
 from .protobuf import dict_to_proto
-from .tools import dict_from_camelcase, expect
+from .tools import expect
 
 REQUIRED_FIELDS = ("Fee", "Sequence", "TransactionType", "Payment")
 REQUIRED_PAYMENT_FIELDS = ("Amount", "Destination")
@@ -44,5 +44,4 @@ def create_sign_tx_msg(transaction) -> messages.RippleSignTx:
     if transaction["TransactionType"] != "Payment":
         raise ValueError("Only Payment transaction type is supported")
 
-    converted = dict_from_camelcase(transaction)
-    return dict_to_proto(messages.RippleSignTx, converted)
+    return dict_to_proto(messages.RippleSignTx, transaction, camelcase=True)
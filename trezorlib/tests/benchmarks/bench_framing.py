@@ -0,0 +1,139 @@
+# This file is part of the Trezor project.
+#
+# Copyright (C) 2012-2018 SatoshiLabs and contributors
+#
+# This library is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3
+# as published by the Free Software Foundation.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the License along with this library.
+# If not, see <https://www.gnu.org/licenses/lgpl-3.0.html>.
+
+"""
+Framing speed of ProtocolV1 and ProtocolV2 writes on large messages.
+
+Sends a `FirmwareUpload` of several megabytes to a transport that discards
+the reports, with the current protocol implementations and with the
+chunking loops used before messages were framed by `framing.ReportWriter`,
+which re-slice the remaining data for every report.
+
+Usage:
+
+    python -m trezorlib.tests.benchmarks.bench_framing --sizes 1 2 4
+"""
+
+import argparse
+import struct
+import time
+from io import BytesIO
+
+from trezorlib import mapping, messages, protobuf
+from trezorlib.protocol_v1 import ProtocolV1
+from trezorlib.protocol_v2 import ProtocolV2
+
+REPLEN = 64
+SESSION = 0x12345678
+
+
+class NullTransport:
+    def __init__(self):
+        self.reports = 0
+
+    def write_chunk(self, chunk):
+        self.reports += 1
+
+
+def legacy_v1_write(transport, msg):
+    data = BytesIO()
+    protobuf.dump_message(data, msg)
+    ser = data.getvalue()
+    header = struct.pack(">HL", mapping.get_type(msg), len(ser))
+    data = bytearray(b"##" + header + ser)
+
+    while data:
+        chunk = b"?" + data[: REPLEN - 1]
+        chunk = chunk.ljust(REPLEN, b"\x00")
+        transport.write_chunk(chunk)
+        data = data[63:]
+
+
+def legacy_v2_write(transport, msg):
+    data = BytesIO()
+    protobuf.dump_message(data, msg)
+    data = data.getvalue()
+    data = struct.pack(">LL", mapping.get_type(msg), len(data)) + data
+    seq = -1
+
+    while data:
+        if seq < 0:
+            repheader = struct.pack(">BL", 0x01, SESSION)
+        else:
+            repheader = struct.pack(">BLL", 0x02, SESSION, seq)
+        datalen = REPLEN - len(repheader)
+        chunk = repheader + data[:datalen]
+        chunk = chunk.ljust(REPLEN, b"\x00")
+        transport.write_chunk(chunk)
+        data = data[datalen:]
+        seq += 1
+
+
+def v1_write(transport, msg):
+    ProtocolV1().write(transport, msg)
+
+
+def v2_write(transport, msg):
+    protocol = ProtocolV2()
+    protocol.session = SESSION
+    protocol.write(transport, msg)
+
+
+WRITERS = {
+    "v1-legacy": legacy_v1_write,
+    "v1": v1_write,
+    "v2-legacy": legacy_v2_write,
+    "v2": v2_write,
+}
+
+
+def measure(write, msg):
+    transport = NullTransport()
+    start = time.perf_counter()
+    write(transport, msg)
+    return time.perf_counter() - start, transport.reports
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--sizes", type=float, nargs="+", default=[1, 2, 4], help="payload MB"
+    )
+    parser.add_argument(
+        "--no-legacy", action="store_true", help="skip the quadratic legacy loops"
+    )
+    args = parser.parse_args()
+
+    print(
+        "{:<12} {:>8} {:>10} {:>10} {:>8}".format(
+            "writer", "MB", "reports", "s", "MB/s"
+        )
+    )
+    for size in args.sizes:
+        msg = messages.FirmwareUpload(payload=bytes(int(size * 1024 * 1024)))
+        for name, write in WRITERS.items():
+            if args.no_legacy and name.endswith("-legacy"):
+                continue
+            elapsed, reports = measure(write, msg)
+            print(
+                "{:<12} {:>8.1f} {:>10} {:>10.3f} {:>8.1f}".format(
+                    name, size, reports, elapsed, size / elapsed
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# This file is part of the Trezor project.
+#
+# Copyright (C) 2012-2018 SatoshiLabs and contributors
+#
+# This library is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3
+# as published by the Free Software Foundation.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the License along with this library.
+# If not, see <https://www.gnu.org/licenses/lgpl-3.0.html>.
+
+"""
+Per-instance memory footprint of protobuf messages.
+
+Compares the generated message classes, which keep their fields in
+`__slots__`, with equivalent classes that store every field in an instance
+`__dict__`, the way messages were stored before.
+
+Usage:
+
+    python -m trezorlib.tests.benchmarks.bench_message_memory
+"""
+
+import argparse
+import tracemalloc
+
+from trezorlib import messages, protobuf
+
+SAMPLES = {
+    messages.TxInputType: dict(
+        address_n=[0x8000002C, 0x80000000, 0x80000000, 0, 5],
+        prev_hash=bytes(32),
+        prev_index=1,
+        script_sig=bytes(107),
+        sequence=0xFFFFFFFF,
+    ),
+    messages.TxOutputBinType: dict(amount=12345678, script_pubkey=bytes(25)),
+    messages.HDNodeType: dict(
+        depth=4,
+        fingerprint=0x12345678,
+        child_num=5,
+        chain_code=bytes(32),
+        public_key=bytes(33),
+    ),
+}
+
+
+def dict_based(msg_type):
+    """Return a variant of `msg_type` that stores its fields in `__dict__`."""
+
+    def __init__(self, **kwargs):
+        # every field was filled in at construction time
+        for fname, repeated in protobuf._get_codec(msg_type).repeated.items():
+            setattr(self, fname, kwargs.get(fname, [] if repeated else None))
+
+    return type(
+        msg_type.__name__ + "Dict",
+        (protobuf.MessageType,),
+        {
+            "__slots__": (),
+            "__init__": __init__,
+            "get_fields": classmethod(lambda cls: msg_type.get_fields()),
+        },
+    )
+
+
+def instance_size(msg_class, kwargs, count):
+    """Average number of bytes allocated per instance of `msg_class`."""
+    instances = [None] * count
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        for i in range(count):
+            instances[i] = msg_class(**kwargs)
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return (after - before) / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-n", "--count", type=int, default=10000)
+    args = parser.parse_args()
+
+    print("{:<20} {:>10} {:>10} {:>8}".format("message", "dict", "slots", "saved"))
+    for msg_type, kwargs in SAMPLES.items():
+        before = instance_size(dict_based(msg_type), kwargs, args.count)
+        after = instance_size(msg_type, kwargs, args.count)
+        print(
+            "{:<20} {:>10.1f} {:>10.1f} {:>7.0%}".format(
+                msg_type.__name__, before, after, 1 - after / before
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
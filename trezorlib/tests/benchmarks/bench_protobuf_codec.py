@@ -0,0 +1,266 @@
+# This file is part of the Trezor project.
+#
+# Copyright (C) 2012-2018 SatoshiLabs and contributors
+#
+# This library is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3
+# as published by the Free Software Foundation.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the License along with this library.
+# If not, see <https://www.gnu.org/licenses/lgpl-3.0.html>.
+
+"""
+Encoding and decoding speed and memory use of protobuf messages.
+
+Every sample message is encoded the way transports do it (`message_size()`
+followed by `dump_message()`) and decoded from a buffer with `decode()`.
+Versions of `trezorlib.protobuf` without these functions are measured with
+`dump_message()` and `load_message()` instead, so that a run on an older
+checkout can serve as the baseline.
+
+Timings are the best of several repeats.  Peak memory and the number of
+memory blocks allocated are measured with `tracemalloc` over a single
+operation.  The block count includes only blocks that are still in use when
+the operation returns, such as its result, not temporary ones.
+
+Results can be written as JSON and compared with a previous run:
+
+    python -m trezorlib.tests.benchmarks.bench_protobuf_codec -o before.json
+    git checkout ...
+    python -m trezorlib.tests.benchmarks.bench_protobuf_codec --compare before.json
+"""
+
+import argparse
+import json
+import platform
+import sys
+import timeit
+import tracemalloc
+from io import BytesIO
+
+from trezorlib import messages, protobuf
+
+H_ = 0x80000000
+
+
+def features():
+    return messages.Features(
+        vendor="trezor.io",
+        major_version=2,
+        minor_version=0,
+        patch_version=10,
+        bootloader_mode=False,
+        device_id="7F0C4A1F8B6C0A5BD1E8F7C2",
+        pin_protection=True,
+        passphrase_protection=False,
+        language="english",
+        label="My Trezor",
+        initialized=True,
+        revision=bytes(20),
+        bootloader_hash=bytes(32),
+        imported=False,
+        pin_cached=True,
+        passphrase_cached=False,
+        needs_backup=False,
+        flags=0,
+        model="T",
+    )
+
+
+def tx_ack_multisig():
+    node = messages.HDNodeType(
+        depth=1,
+        fingerprint=0x12345678,
+        child_num=H_,
+        chain_code=bytes(range(32)),
+        public_key=b"\x03" + bytes(range(32)),
+    )
+    multisig = messages.MultisigRedeemScriptType(
+        pubkeys=[messages.HDNodePathType(node=node, address_n=[i]) for i in range(3)],
+        signatures=[b"", bytes(71), b""],
+        m=2,
+    )
+    inp = messages.TxInputType(
+        address_n=[48 | H_, H_, H_, 0, 1],
+        prev_hash=bytes(range(32)),
+        prev_index=1,
+        script_type=messages.InputScriptType.SPENDMULTISIG,
+        multisig=multisig,
+        amount=100000000,
+        sequence=0xFFFFFFFF,
+    )
+    return messages.TxAck(tx=messages.TransactionType(inputs=[inp]))
+
+
+def ethereum_sign_tx():
+    return messages.EthereumSignTx(
+        address_n=[44 | H_, 60 | H_, H_, 0, 0],
+        nonce=b"\x01",
+        gas_price=b"\x04\xa8\x17\xc8\x00",
+        gas_limit=b"\x01\x86\xa0",
+        to=bytes(20),
+        value=b"\x0d\xe0\xb6\xb3\xa7\x64\x00\x00",
+        data_initial_chunk=bytes(1024),
+        data_length=1024,
+        chain_id=1,
+    )
+
+
+def firmware_upload():
+    return messages.FirmwareUpload(payload=bytes(128 * 1024))
+
+
+def stellar_sign_tx():
+    return messages.StellarSignTx(
+        address_n=[44 | H_, 148 | H_, H_],
+        network_passphrase="Public Global Stellar Network ; September 2015",
+        source_account="GAK5MSF74TJW6GLM7NLTL76YZJKM2S4CGP3UH4REJHPHZ4YBZW2GSBPW",
+        fee=100,
+        sequence_number=4294967296,
+        timebounds_start=0,
+        timebounds_end=1577836800,
+        memo_type=1,
+        memo_text="benchmark",
+        num_operations=1,
+    )
+
+
+SAMPLES = {
+    "Features": features,
+    "TxAck-multisig": tx_ack_multisig,
+    "EthereumSignTx-1K": ethereum_sign_tx,
+    "FirmwareUpload-128K": firmware_upload,
+    "StellarSignTx": stellar_sign_tx,
+}
+
+
+def encode(msg):
+    writer = BytesIO()
+    if hasattr(protobuf, "message_size"):
+        protobuf.message_size(msg)
+    protobuf.dump_message(writer, msg)
+    return writer.getvalue()
+
+
+def decode(data, msg_type):
+    if hasattr(protobuf, "decode"):
+        return protobuf.decode(data, msg_type)
+    return protobuf.load_message(BytesIO(data), msg_type)
+
+
+def best_time(func, repeat):
+    """Seconds per call of `func`, best of `repeat` runs."""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat, number)) / number
+
+
+def peak_memory(func):
+    """Peak number of bytes allocated during a single call of `func`."""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def allocated_blocks(func):
+    """Number of memory blocks allocated by a single call of `func` and kept."""
+    exclude = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot().filter_traces(exclude)
+        # the result is kept alive until the second snapshot, so it is counted
+        result = func()
+        after = tracemalloc.take_snapshot().filter_traces(exclude)
+    finally:
+        tracemalloc.stop()
+    del result
+    return sum(stat.count_diff for stat in after.compare_to(before, "lineno"))
+
+
+def run_sample(make_msg, repeat):
+    msg = make_msg()
+    msg_type = msg.__class__
+    data = encode(msg)
+    assert decode(data, msg_type) == msg
+
+    encode_time = best_time(lambda: encode(msg), repeat)
+    decode_time = best_time(lambda: decode(data, msg_type), repeat)
+    return {
+        "size": len(data),
+        "encode_us": encode_time * 1e6,
+        "decode_us": decode_time * 1e6,
+        "encode_mb_s": len(data) / encode_time / 1e6,
+        "decode_mb_s": len(data) / decode_time / 1e6,
+        "encode_peak_bytes": peak_memory(lambda: encode(msg)),
+        "decode_peak_bytes": peak_memory(lambda: decode(data, msg_type)),
+        "encode_blocks": allocated_blocks(lambda: encode(msg)),
+        "decode_blocks": allocated_blocks(lambda: decode(data, msg_type)),
+    }
+
+
+def print_results(results, baseline=None):
+    columns = (
+        "size",
+        "encode_us",
+        "decode_us",
+        "encode_peak_bytes",
+        "decode_peak_bytes",
+        "encode_blocks",
+        "decode_blocks",
+    )
+    print("{:<20}".format("message") + "".join("{:>19}".format(c) for c in columns))
+    for name, result in results.items():
+        line = "{:<20}".format(name)
+        for column in columns:
+            value = result[column]
+            try:
+                old = baseline["results"][name][column]
+                line += "{:>11.1f} ({:+4.0%})".format(value, value / old - 1)
+            except (TypeError, KeyError, ZeroDivisionError):
+                line += "{:>19.1f}".format(value)
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-r", "--repeat", type=int, default=5)
+    parser.add_argument("-o", "--output", help="write results as JSON to a file")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    parser.add_argument("--compare", help="JSON results of a previous run")
+    args = parser.parse_args()
+
+    results = {
+        "python": sys.version.split()[0],
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "results": {
+            name: run_sample(make_msg, args.repeat)
+            for name, make_msg in SAMPLES.items()
+        },
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if args.json:
+        json.dump(results, sys.stdout, indent=2, sort_keys=True)
+        print()
+        return
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_results(results["results"], baseline)
+
+
+if __name__ == "__main__":
+    main()
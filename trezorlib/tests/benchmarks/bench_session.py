@@ -0,0 +1,74 @@
+# This file is part of the Trezor project.
+#
+# Copyright (C) 2012-2018 SatoshiLabs and contributors
+#
+# This library is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3
+# as published by the Free Software Foundation.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the License along with this library.
+# If not, see <https://www.gnu.org/licenses/lgpl-3.0.html>.
+
+"""
+Per-call latency of `get_address` with and without a held transport session.
+
+Needs a connected device or a running emulator.  Every call is measured
+once with the transport opened and closed around it (the default), and once
+with the client kept open across calls.
+
+Usage:
+
+    python -m trezorlib.tests.benchmarks.bench_session -n 100 -p udp:127.0.0.1:21324
+"""
+
+import argparse
+import time
+
+from trezorlib import btc, tools, ui
+from trezorlib.client import TrezorClient
+from trezorlib.transport import get_transport
+
+
+def measure(client, count, path):
+    timings = []
+    for i in range(count):
+        start = time.perf_counter()
+        btc.get_address(client, "Bitcoin", path + [i])
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def report(name, timings):
+    timings = sorted(timings)
+    print(
+        "{:<10} {:>8.2f} {:>8.2f} {:>8.2f}".format(
+            name,
+            sum(timings) / len(timings) * 1000,
+            timings[len(timings) // 2] * 1000,
+            timings[-1] * 1000,
+        )
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-n", "--count", type=int, default=50)
+    parser.add_argument("-p", "--path", help="transport path of the device")
+    args = parser.parse_args()
+
+    path = tools.parse_path("m/44'/0'/0'/0")
+    client = TrezorClient(get_transport(args.path), ui=ui.ClickUI())
+
+    print("{:<10} {:>8} {:>8} {:>8}".format("session", "avg ms", "median", "max"))
+    report("per-call", measure(client, args.count, path))
+    with client:
+        report("kept open", measure(client, args.count, path))
+
+
+if __name__ == "__main__":
+    main()
@@ -17,7 +17,7 @@
 import pytest
 
 from trezorlib import btc, messages as proto
-from trezorlib.tools import H_, CallException, parse_path
+from trezorlib.tools import H_, CallException, parse_path, parse_path_range
 
 from ..support import ckd_public as bip32
 from .common import TrezorTest
@@ -203,3 +203,25 @@ class TestMsgGetaddress(TrezorTest):
 
         assert address2 == "1CK7SJdcb8z9HuvVft3D91HLpLC6KSsGb"
         assert address1 == address2
+
+    def test_get_addresses(self):
+        self.setup_mnemonic_nopin_nopassphrase()
+
+        paths = list(parse_path_range("m/44h/0h/0h/0/0-9"))
+        expected = [btc.get_address(self.client, "Bitcoin", n) for n in paths]
+
+        addresses = btc.get_addresses(self.client, "Bitcoin", "m/44h/0h/0h/0/0-9")
+        assert list(addresses) == expected
+        addresses = btc.get_addresses(self.client, "Bitcoin", paths)
+        assert list(addresses) == expected
+
+        # stopping early leaves the client usable
+        addresses = btc.get_addresses(self.client, "Bitcoin", paths)
+        assert next(addresses) == expected[0]
+        addresses.close()
+        assert btc.get_address(self.client, "Bitcoin", paths[1]) == expected[1]
+
+        nodes = btc.get_public_nodes(self.client, "m/44h/0h/0h/0/0-3")
+        assert [node.node.public_key for node in nodes] == [
+            btc.get_public_node(self.client, n).node.public_key for n in paths[:4]
+        ]
@@ -0,0 +1,61 @@
+# This file is part of the Trezor project.
+#
+# Copyright (C) 2012-2018 SatoshiLabs and contributors
+#
+# This library is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3
+# as published by the Free Software Foundation.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the License along with this library.
+# If not, see <https://www.gnu.org/licenses/lgpl-3.0.html>.
+
+import pytest
+
+from trezorlib import _secp256k1 as secp256k1, bip32
+
+XPUB = "xpub661MyMwAqRbcEnKbXcCqD2GT1di5zQxVqoHPAgHNe8dv5JP8gWmDproS6kFHJnLZd23tWevhdn4urGJ6b264DfTGKr8zjmYDjyDTi9U7iyT"
+
+
+def multiply_naive(k):
+    R = secp256k1.INFINITY
+    for bit in bin(k)[2:]:
+        R = secp256k1.jacobian_double(R)
+        if bit == "1":
+            R = secp256k1.jacobian_add_affine(R, secp256k1.G)
+    return secp256k1.to_affine(R)
+
+
+@pytest.mark.parametrize(
+    "k", [1, 2, 255, 256, 0xDEADBEEF << 100, secp256k1.n - 1, secp256k1.n // 3]
+)
+def test_multiply_generator(k):
+    assert secp256k1.to_affine(secp256k1.multiply_generator(k)) == multiply_naive(k)
+
+
+def test_decompress():
+    point = multiply_naive(12345)
+    assert secp256k1.decompress(secp256k1.compress(point)) == point
+
+
+def test_derive_range():
+    children = bip32.derive_range(XPUB, 0, 5)
+    assert (
+        bip32.serialize(children[0])
+        == "xpub67ymn1YTdE2iSGXitxUEZeUdHF2FsejJATroeAxVMtzTAK9o3vjmFLrE7TqE1X76iobkVc3p8h3gNzNRTwPeQGYW3CCmYCG8n5ThVkXaQzs"
+    )
+    assert [child.child_num for child in children] == list(range(5))
+    for i, child in enumerate(children):
+        assert child.public_key == bip32.public_ckd(XPUB, [i]).public_key
+
+    assert (
+        bip32.serialize(bip32.derive_range(children[0], 0, 1)[0])
+        == "xpub6BD2MwdEg5PJPqiGetL9DJs7oDo6zP3XwAABX2vAQb5eLpY3QhHGUEm25V4nkQhnFMsqEVfTwtax2gKz8EFrt1PnBN6xQjE9jGmWDR6modu"
+    )
+
+    with pytest.raises(ValueError):
+        bip32.derive_range(XPUB, 0x80000000, 1)
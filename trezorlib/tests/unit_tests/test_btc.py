@@ -0,0 +1,168 @@
+# This file is part of the Trezor project.
+#
+# Copyright (C) 2012-2018 SatoshiLabs and contributors
+#
+# This library is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3
+# as published by the Free Software Foundation.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the License along with this library.
+# If not, see <https://www.gnu.org/licenses/lgpl-3.0.html>.
+
+from collections import deque
+from types import SimpleNamespace
+
+import pytest
+
+from trezorlib import btc, exceptions, messages as proto
+from trezorlib.cache import AddressCache
+from trezorlib.client import BaseClient
+from trezorlib.transport import Transport
+
+
+def address(n):
+    return "addr" + "/".join(map(str, n))
+
+
+class PipelineTransport(Transport):
+    """Answers GetAddress with made-up addresses and logs writes and reads."""
+
+    def __init__(self, depth, fail_at=None):
+        super().__init__()
+        self.PIPELINE_DEPTH = depth
+        self.fail_at = fail_at
+        self.log = []
+        self.responses = deque()
+        self.opened = 0
+
+    def get_path(self):
+        return "pipeline"
+
+    def open(self):
+        self.opened += 1
+
+    def close(self):
+        pass
+
+    def write(self, msg):
+        self.log.append(("write", msg.address_n))
+        if msg.address_n == self.fail_at:
+            resp = proto.Failure(code=proto.FailureType.DataError, message="fail")
+        else:
+            resp = proto.Address(address=address(msg.address_n))
+        self.responses.append((msg.address_n, resp))
+
+    def read(self):
+        n, resp = self.responses.popleft()
+        self.log.append(("read", n))
+        return resp
+
+    def max_outstanding(self):
+        outstanding = highest = 0
+        for op, _ in self.log:
+            outstanding += 1 if op == "write" else -1
+            highest = max(highest, outstanding)
+        return highest
+
+
+def get_addresses(transport, paths, **kwargs):
+    client = BaseClient(transport, ui=None)
+    return btc.get_addresses(client, "Bitcoin", paths, **kwargs)
+
+
+def test_pipelined_order():
+    transport = PipelineTransport(depth=4)
+    paths = [[i] for i in range(10)]
+    assert list(get_addresses(transport, paths)) == [address(n) for n in paths]
+
+    # responses are read in the order in which the requests were written
+    assert [n for op, n in transport.log if op == "write"] == paths
+    assert [n for op, n in transport.log if op == "read"] == paths
+    # the first request is a plain call, the others are pipelined
+    assert transport.log[:2] == [("write", [0]), ("read", [0])]
+    assert transport.max_outstanding() == 4
+    assert transport.opened == 1
+    assert transport.session_counter == 0
+
+
+def test_pipelined_show_display():
+    transport = PipelineTransport(depth=4)
+    paths = [[i] for i in range(5)]
+    result = get_addresses(transport, paths, show_display=True)
+    assert list(result) == [address(n) for n in paths]
+    assert transport.max_outstanding() == 1
+
+
+def test_pipelined_close():
+    transport = PipelineTransport(depth=4)
+    addresses = get_addresses(transport, [[i] for i in range(10)])
+    assert next(addresses) == address([0])
+    assert next(addresses) == address([1])
+    addresses.close()
+
+    # responses to requests that were already written are drained
+    assert not transport.responses
+    assert transport.log.count(("write", [4])) == 1
+    assert ("write", [5]) not in transport.log
+    assert transport.session_counter == 0
+
+
+def test_pipelined_failure():
+    transport = PipelineTransport(depth=4, fail_at=[3])
+    addresses = get_addresses(transport, [[i] for i in range(10)])
+    assert [next(addresses) for _ in range(3)] == [address([i]) for i in range(3)]
+    with pytest.raises(exceptions.TrezorFailure):
+        next(addresses)
+
+    assert not transport.responses
+    assert ("write", [7]) not in transport.log
+    assert transport.session_counter == 0
+
+
+def cached_client(transport, tmpdir):
+    client = BaseClient(transport, ui=None)
+    client.features = SimpleNamespace(device_id="ABCD", passphrase_protection=False)
+    client.state = None
+    client.address_cache = AddressCache(str(tmpdir / "cache.db"))
+    return client
+
+
+def test_cached_all_hits(tmpdir):
+    transport = PipelineTransport(depth=4)
+    client = cached_client(transport, tmpdir)
+    paths = [[i] for i in range(5)]
+    assert list(btc.get_addresses(client, "Bitcoin", paths)) == [
+        address(n) for n in paths
+    ]
+    assert transport.opened == 1
+
+    # everything is cached now, so the device is not opened at all
+    transport = client.transport = PipelineTransport(depth=4)
+    assert list(btc.get_addresses(client, "Bitcoin", paths)) == [
+        address(n) for n in paths
+    ]
+    assert transport.opened == 0
+    assert transport.log == []
+
+
+def test_cached_mixed(tmpdir):
+    transport = PipelineTransport(depth=4)
+    client = cached_client(transport, tmpdir)
+    list(btc.get_addresses(client, "Bitcoin", [[0], [2], [3], [6], [9]]))
+
+    transport = client.transport = PipelineTransport(depth=4)
+    paths = [[i] for i in range(10)]
+    assert list(btc.get_addresses(client, "Bitcoin", paths)) == [
+        address(n) for n in paths
+    ]
+    # only the misses are requested, in order, in a single session
+    misses = [[1], [4], [5], [7], [8]]
+    assert [n for op, n in transport.log if op == "write"] == misses
+    assert [n for op, n in transport.log if op == "read"] == misses
+    assert transport.opened == 1
+    assert transport.session_counter == 0
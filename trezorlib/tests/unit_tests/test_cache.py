@@ -0,0 +1,85 @@
+# This file is part of the Trezor project.
+#
+# Copyright (C) 2012-2018 SatoshiLabs and contributors
+#
+# This library is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3
+# as published by the Free Software Foundation.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the License along with this library.
+# If not, see <https://www.gnu.org/licenses/lgpl-3.0.html>.
+
+from types import SimpleNamespace
+
+from trezorlib import cache
+from trezorlib.cache import AddressCache
+
+
+def client(device_id="ABCD", passphrase_protection=False, state=None):
+    features = SimpleNamespace(
+        device_id=device_id, passphrase_protection=passphrase_protection
+    )
+    return SimpleNamespace(features=features, state=state)
+
+
+def test_persistent(tmpdir):
+    filename = str(tmpdir / "cache.db")
+    key = AddressCache.key(client(), "address", [1, 2], "Bitcoin", 0)
+
+    c = AddressCache(filename)
+    assert c.get(key) is None
+    c.put(key, b"1address")
+    c.close()
+
+    c = AddressCache(filename)
+    assert c.get(key) == b"1address"
+    c.invalidate("ABCD")
+    assert c.get(key) is None
+
+
+def test_key():
+    key = AddressCache.key(client(), "address", [1, 2], "Bitcoin", 0)
+    assert key != AddressCache.key(client(), "address", [1, 3], "Bitcoin", 0)
+    assert key != AddressCache.key(client("EFGH"), "address", [1, 2], "Bitcoin", 0)
+    assert key != AddressCache.key(client(), "address", [1, 2], "Bitcoin", 1)
+
+    # results of a passphrase-protected wallet need its state
+    assert AddressCache.key(client(passphrase_protection=True), "address", []) is None
+    key_a = AddressCache.key(client(passphrase_protection=True, state=b"a"), "a", [])
+    key_b = AddressCache.key(client(passphrase_protection=True, state=b"b"), "a", [])
+    assert key_a != key_b
+    assert AddressCache.key(client(device_id=None), "address", []) is None
+
+
+def test_lru_eviction(tmpdir, monkeypatch):
+    monkeypatch.setattr(cache, "COMMIT_INTERVAL", 1)
+    c = AddressCache(str(tmpdir / "cache.db"), max_entries=3)
+    keys = [AddressCache.key(client(), "address", [i]) for i in range(4)]
+    for key in keys[:3]:
+        c.put(key, b"x")
+    c.get(keys[0])
+    c.put(keys[3], b"x")
+    assert c.get(keys[1]) is None
+    assert all(c.get(key) == b"x" for key in (keys[0], keys[2], keys[3]))
+
+
+def test_lookups_do_not_lock(tmpdir):
+    filename = str(tmpdir / "cache.db")
+    key = AddressCache.key(client(), "address", [1])
+    writer = AddressCache(filename)
+    writer.put(key, b"1address")
+    writer.flush()
+
+    reader = AddressCache(filename)
+    assert reader.get(key) == b"1address"
+    # the reader holds no write transaction, so others can still write
+    writer.db.execute("PRAGMA busy_timeout = 0")
+    writer.put(AddressCache.key(client(), "address", [2]), b"2address")
+    writer.flush()
+    reader.close()
+    writer.close()
@@ -0,0 +1,112 @@
+# This file is part of the Trezor project.
+#
+# Copyright (C) 2012-2018 SatoshiLabs and contributors
+#
+# This library is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3
+# as published by the Free Software Foundation.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the License along with this library.
+# If not, see <https://www.gnu.org/licenses/lgpl-3.0.html>.
+
+import threading
+import time
+
+from trezorlib import tools
+from trezorlib.client import BaseClient
+from trezorlib.transport import Transport
+
+
+class CountingTransport(Transport):
+    def __init__(self, close_delay=0):
+        super().__init__()
+        self.close_delay = close_delay
+        self.opened = 0
+        self.closed = 0
+        self.is_open = False
+        self.writes_while_closed = 0
+
+    def get_path(self):
+        return "counting"
+
+    def open(self):
+        self.opened += 1
+        self.is_open = True
+
+    def close(self):
+        time.sleep(self.close_delay)
+        self.closed += 1
+        self.is_open = False
+
+    def write(self, msg):
+        if not self.is_open:
+            self.writes_while_closed += 1
+
+
+class Client(BaseClient):
+    @tools.session
+    def call_raw(self, msg):
+        self._raw_write(msg)
+
+
+def test_per_call_session():
+    transport = CountingTransport()
+    client = Client(transport, ui=None)
+    for _ in range(3):
+        client.call_raw(None)
+    assert transport.opened == transport.closed == 3
+
+
+def test_keep_open():
+    transport = CountingTransport()
+    with Client(transport, ui=None) as client:
+        for _ in range(3):
+            client.call_raw(None)
+        assert transport.opened == 1
+        assert transport.closed == 0
+    assert transport.closed == 1
+
+
+def test_idle_timeout():
+    transport = CountingTransport()
+    client = Client(transport, ui=None, keep_open=True, idle_timeout=0.05)
+    client.call_raw(None)
+    time.sleep(0.2)
+    assert transport.opened == transport.closed == 1
+
+    # the next call takes the session again
+    client.call_raw(None)
+    assert transport.opened == 2
+    assert transport.closed == 1
+    client.close()
+    assert transport.closed == 2
+
+
+def test_idle_timeout_concurrent_calls():
+    # a slow close gives calls a chance to start while the session is released
+    transport = CountingTransport(close_delay=0.002)
+    client = Client(transport, ui=None, keep_open=True, idle_timeout=0.001)
+
+    def calls():
+        for i in range(50):
+            client.call_raw(None)
+            time.sleep(0.001 * (i % 4))
+
+    threads = [threading.Thread(target=calls) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert transport.writes_while_closed == 0
+    watchers = [t for t in threading.enumerate() if t.name == "trezor-idle"]
+    assert len(watchers) <= 1
+
+    client.close()
+    assert transport.session_counter == 0
+    assert transport.opened == transport.closed
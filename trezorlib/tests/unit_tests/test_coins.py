@@ -0,0 +1,37 @@
+# This file is part of the Trezor project.
+#
+# Copyright (C) 2012-2018 SatoshiLabs and contributors
+#
+# This library is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3
+# as published by the Free Software Foundation.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the License along with this library.
+# If not, see <https://www.gnu.org/licenses/lgpl-3.0.html>.
+
+from trezorlib import coins
+
+
+def test_indexes():
+    bitcoin = coins.by_name["Bitcoin"]
+    assert coins.by_shortcut["BTC"] == "Bitcoin"
+    assert "Bitcoin" in coins.by_slip44[0]
+    assert "Bitcoin" in coins.by_address_type[bitcoin["address_type"]]
+    assert coins.slip44["Testnet"] == 1
+
+    for name, coin in coins.by_name.items():
+        assert coins.slip44[name] == coin["slip44"]
+        assert name in coins.by_slip44[coin["slip44"]]
+
+
+def test_tx_api_lazy():
+    assert "Bitcoin" in coins.tx_api
+    api = coins.tx_api["Bitcoin"]
+    assert api is coins.tx_api["Bitcoin"]
+    assert api.network == "insight_bitcoin"
+    assert set(coins.tx_api) <= set(coins.by_name)
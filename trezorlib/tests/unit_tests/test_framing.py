@@ -0,0 +1,117 @@
+# This file is part of the Trezor project.
+#
+# Copyright (C) 2012-2018 SatoshiLabs and contributors
+#
+# This library is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3
+# as published by the Free Software Foundation.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the License along with this library.
+# If not, see <https://www.gnu.org/licenses/lgpl-3.0.html>.
+
+import pytest
+
+from trezorlib import protocol_v1
+from trezorlib.framing import REPLEN, ReportWriter, reassemble
+
+
+class ChunkCollector:
+    def __init__(self):
+        self.chunks = []
+
+    def write_chunk(self, chunk):
+        assert len(chunk) == REPLEN
+        self.chunks.append(bytes(chunk))
+
+    def read_chunk(self):
+        return bytearray(self.chunks.pop(0))
+
+
+def pack_header(report, index):
+    if index == 0:
+        report[0] = ord("?")
+        return 1
+    report[0:2] = bytes([index, index])
+    return 2
+
+
+def test_report_writer():
+    transport = ChunkCollector()
+    writer = ReportWriter(transport, pack_header)
+    writer.write(b"a" * 10)
+    writer.write(bytearray(b"b" * 100))
+    # a full report is written out right away
+    assert len(transport.chunks) == 1
+    writer.write(memoryview(b"c" * 50))
+    writer.close()
+
+    data = b"a" * 10 + b"b" * 100 + b"c" * 50
+    assert transport.chunks == [
+        b"?" + data[:63],
+        b"\x01\x01" + data[63:125],
+        b"\x02\x02" + data[125:] + b"\x00" * 27,
+    ]
+
+
+def test_report_writer_exact_fit():
+    transport = ChunkCollector()
+    writer = ReportWriter(transport, pack_header)
+    writer.write(b"x" * 63)
+    writer.close()
+    assert transport.chunks == [b"?" + b"x" * 63]
+
+
+def parse_next(chunk):
+    assert chunk[0] == chunk[1]
+    return memoryview(chunk)[2:]
+
+
+def test_reassemble():
+    transport = ChunkCollector()
+    writer = ReportWriter(transport, pack_header)
+    data = bytes(range(200))
+    writer.write(data)
+    writer.close()
+    assert len(transport.chunks) == 4
+    transport.chunks.append(b"next message")
+
+    first = transport.chunks.pop(0)
+    result = reassemble(transport, len(data), first[1:], parse_next)
+    assert result == data
+    assert len(result.obj) == len(data)  # allocated once, without padding
+    assert transport.chunks == [b"next message"]
+
+
+
+def test_reassemble_too_long():
+    transport = ChunkCollector()
+    writer = ReportWriter(transport, pack_header)
+    writer.write(bytes(200))
+    writer.close()
+    transport.chunks.append(b"next message")
+
+    first = transport.chunks.pop(0)
+    with pytest.raises(RuntimeError):
+        reassemble(transport, 200, first[1:], parse_next, max_size=199)
+    # the rest of the rejected message was consumed
+    assert transport.chunks == [b"next message"]
+
+
+def test_protocol_max_message_size():
+    transport = ChunkCollector()
+    writer = ReportWriter(transport, protocol_v1._pack_report_header)
+    writer.write(b"##" + protocol_v1.MESSAGE_HEADER.pack(1, 200) + bytes(200))
+    writer.close()
+    transport.chunks.append(b"next message")
+
+    protocol = protocol_v1.ProtocolV1()
+    protocol.max_message_size = 100
+    with pytest.raises(RuntimeError):
+        protocol.read(transport)
+    assert transport.chunks == [b"next message"]
+
@@ -0,0 +1,54 @@
+# This file is part of the Trezor project.
+#
+# Copyright (C) 2012-2018 SatoshiLabs and contributors
+#
+# This library is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3
+# as published by the Free Software Foundation.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the License along with this library.
+# If not, see <https://www.gnu.org/licenses/lgpl-3.0.html>.
+
+import json
+import subprocess
+import sys
+
+# modules of trezorlib that `import trezorlib.client` may load
+CLIENT_IMPORTS = {
+    "trezorlib",
+    "trezorlib.client",
+    "trezorlib.coins",
+    "trezorlib.exceptions",
+    "trezorlib.mapping",
+    "trezorlib.messages",
+    "trezorlib.protobuf",
+    "trezorlib.tools",
+}
+
+# heavy dependencies that are only needed for some coins or transports
+HEAVY_IMPORTS = {"construct", "ecdsa", "pyblake2", "requests", "usb1", "xdrlib"}
+
+
+def imported_modules(statement):
+    """Names of modules loaded by `statement` in a fresh interpreter."""
+    script = "import json, sys; {}; print(json.dumps(sorted(sys.modules)))"
+    output = subprocess.check_output(
+        [sys.executable, "-c", script.format(statement)], universal_newlines=True
+    )
+    return set(json.loads(output))
+
+
+def test_client_imports():
+    modules = imported_modules("import trezorlib.client")
+    trezorlib_modules = {
+        name
+        for name in modules
+        if name.startswith("trezorlib") and not name.startswith("trezorlib.messages.")
+    }
+    assert trezorlib_modules <= CLIENT_IMPORTS
+    assert not modules & HEAVY_IMPORTS
@@ -0,0 +1,58 @@
+# This file is part of the Trezor project.
+#
+# Copyright (C) 2012-2018 SatoshiLabs and contributors
+#
+# This library is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3
+# as published by the Free Software Foundation.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the License along with this library.
+# If not, see <https://www.gnu.org/licenses/lgpl-3.0.html>.
+
+import pytest
+
+from trezorlib import mapping, messages, protobuf
+
+
+class CustomMessage(protobuf.MessageType):
+    MESSAGE_WIRE_TYPE = 0xFFF0
+
+    @classmethod
+    def get_fields(cls):
+        return {}
+
+
+def test_resolve_on_demand():
+    msg_class = mapping.get_class(messages.MessageType.Features)
+    assert msg_class is messages.Features
+    assert mapping.get_type(messages.Initialize()) == messages.MessageType.Initialize
+
+    with pytest.raises(KeyError):
+        mapping.get_class(0xFFFF)
+
+
+def test_build_map():
+    mapping.build_map()
+    for msg_name in dir(messages.MessageType):
+        if msg_name.startswith("__"):
+            continue
+        msg_class = getattr(messages, msg_name)
+        assert mapping.get_class(msg_class.MESSAGE_WIRE_TYPE) is msg_class
+
+
+def test_register_message():
+    mapping.register_message(CustomMessage)
+    assert mapping.get_class(0xFFF0) is CustomMessage
+    assert mapping.get_type(CustomMessage()) == 0xFFF0
+
+    class Duplicate(CustomMessage):
+        MESSAGE_WIRE_TYPE = messages.MessageType.Address
+
+    # taken by a generated message, even though it may not be loaded yet
+    with pytest.raises(Exception):
+        mapping.register_message(Duplicate)
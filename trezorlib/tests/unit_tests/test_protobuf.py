@@ -14,6 +14,7 @@
 # You should have received a copy of the License along with this library.
 # If not, see <https://www.gnu.org/licenses/lgpl-3.0.html>.
 
+from array import array
 from io import BytesIO
 
 import pytest
@@ -33,6 +34,27 @@ class PrimitiveMessage(protobuf.MessageType):
         }
 
 
+class EmbeddedMessage(protobuf.MessageType):
+    @classmethod
+    def get_fields(cls):
+        return {
+            1: ("primitive", PrimitiveMessage, 0),
+            2: ("repeated_uvarint", protobuf.UVarintType, protobuf.FLAG_REPEATED),
+            3: ("repeated_message", PrimitiveMessage, protobuf.FLAG_REPEATED),
+        }
+
+
+class PackedMessage(protobuf.MessageType):
+    @classmethod
+    def get_fields(cls):
+        packed = protobuf.FLAG_REPEATED | protobuf.FLAG_PACKED
+        return {
+            1: ("uvarints", protobuf.UVarintType, packed),
+            2: ("svarints", protobuf.SVarintType, packed),
+            3: ("bools", protobuf.BoolType, packed),
+        }
+
+
 def load_uvarint(buffer):
     reader = BytesIO(buffer)
     return protobuf.load_uvarint(reader)
@@ -103,3 +125,260 @@ def test_simple_message():
     assert retr.bool is True
     assert retr.bytes == b"\xDE\xAD\xCA\xFE"
     assert retr.unicode == "Příliš žluťoučký kůň úpěl ďábelské ódy 😊"
+
+
+def test_embedded_message():
+    msg = EmbeddedMessage(
+        primitive=PrimitiveMessage(uvarint=1, unicode="a"),
+        repeated_uvarint=[1, 300],
+        repeated_message=[PrimitiveMessage(bool=False), PrimitiveMessage(bytes=b"")],
+    )
+
+    buf = BytesIO()
+    protobuf.dump_message(buf, msg)
+    assert buf.getvalue() == (
+        b"\x0a\x05\x00\x01\x22\x01a"  # primitive
+        + b"\x10\x01\x10\xac\x02"  # repeated_uvarint
+        + b"\x1a\x02\x10\x00\x1a\x02\x1a\x00"  # repeated_message
+    )
+
+    buf.seek(0)
+    retr = protobuf.load_message(buf, EmbeddedMessage)
+    assert retr == msg
+    assert retr.primitive.svarint is None
+    assert retr.repeated_message[1].bytes == b""
+
+
+def test_unknown_fields_skipped():
+    # field 15 as varint, field 14 as bytes, then bool=True
+    buf = BytesIO(b"\x78\x96\x01" + b"\x72\x03abc" + b"\x10\x01")
+    msg = protobuf.load_message(buf, PrimitiveMessage)
+    assert msg == PrimitiveMessage(bool=True)
+
+
+def test_wire_type_mismatch():
+    # bytes field (3) encoded as a varint
+    with pytest.raises(TypeError):
+        protobuf.load_message(BytesIO(b"\x18\x01"), PrimitiveMessage)
+
+
+class RecursiveMessage(protobuf.MessageType):
+    @classmethod
+    def get_fields(cls):
+        return {
+            1: ("uvarint", protobuf.UVarintType, 0),
+            2: ("inner", RecursiveMessage, 0),
+        }
+
+
+def test_deeply_nested_message():
+    # with one serialization pass per nesting level, this would never finish
+    msg = RecursiveMessage(uvarint=0)
+    for i in range(1, 64):
+        msg = RecursiveMessage(uvarint=i, inner=msg)
+
+    buf = BytesIO()
+    protobuf.dump_message(buf, msg)
+
+    buf.seek(0)
+    retr = protobuf.load_message(buf, RecursiveMessage)
+    assert retr == msg
+
+
+def test_decode_buffer():
+    msg = EmbeddedMessage(
+        primitive=PrimitiveMessage(bytes=b"\x00" * 200, unicode="ďábelské ódy"),
+        repeated_uvarint=[0, 1 << 40],
+        repeated_message=[PrimitiveMessage(svarint=-3)],
+    )
+    buf = BytesIO()
+    protobuf.dump_message(buf, msg)
+    data = buf.getvalue()
+
+    assert protobuf.decode(data, EmbeddedMessage) == msg
+    assert protobuf.decode(bytearray(data), EmbeddedMessage) == msg
+    assert protobuf.decode(memoryview(data), EmbeddedMessage) == msg
+
+    retr = protobuf.decode(data, EmbeddedMessage, zero_copy=True)
+    assert isinstance(retr.primitive.bytes, memoryview)
+    assert retr.primitive.bytes == msg.primitive.bytes
+    assert retr.primitive.unicode == msg.primitive.unicode
+
+    with pytest.raises(EOFError):
+        protobuf.decode(data[:-1], EmbeddedMessage)
+
+
+def test_slots_and_defaults():
+    msg = EmbeddedMessage(repeated_uvarint=[1])
+    assert set(EmbeddedMessage.__slots__) == set(msg)
+    assert msg.__dict__ == {}
+
+    # fields that were never set read as defaults
+    assert msg.primitive is None
+    assert msg.repeated_message == []
+    msg.repeated_message.append(PrimitiveMessage())
+    assert len(msg.repeated_message) == 1
+
+    # attributes that are not fields are kept in the instance dict
+    msg.nonexistent_field = 1
+    assert msg.__dict__ == {"nonexistent_field": 1}
+    with pytest.raises(AttributeError):
+        msg.other_nonexistent_field
+    del msg.nonexistent_field
+
+    copy = EmbeddedMessage()
+    copy.CopyFrom(msg)
+    assert copy == msg
+    assert msg != EmbeddedMessage(repeated_uvarint=[1])
+
+
+class PlainMessage(protobuf.MessageType):
+    pass
+
+
+def test_slots_fallback():
+    # the schema of RecursiveMessage cannot be read before the class exists,
+    # so its fields live in the instance dict
+    assert RecursiveMessage.__slots__ == ()
+    msg = RecursiveMessage(uvarint=1, inner=RecursiveMessage(uvarint=2))
+    assert msg.__dict__["uvarint"] == 1
+    buf = BytesIO()
+    protobuf.dump_message(buf, msg)
+    retr = protobuf.decode(buf.getvalue(), RecursiveMessage)
+    assert retr == msg
+    assert retr.inner.inner is None
+
+    plain = PlainMessage()
+    plain.anything = 1
+    assert plain.anything == 1
+
+
+def test_byte_size():
+    msg = EmbeddedMessage(
+        primitive=PrimitiveMessage(bytes=b"\x00" * 10),
+        repeated_message=[PrimitiveMessage(uvarint=1), PrimitiveMessage(uvarint=2)],
+    )
+
+    def serialized_size():
+        buf = BytesIO()
+        protobuf.dump_message(buf, msg)
+        return len(buf.getvalue())
+
+    assert msg.ByteSize() == serialized_size() == 22
+    # sizes of embedded messages are cached along the way
+    assert msg.primitive._size_cache[1] == 12
+    assert msg.ByteSize() == 22
+
+    # creating or changing unrelated messages keeps the cached size
+    cache = msg._size_cache
+    other = PrimitiveMessage(uvarint=1)
+    other.uvarint = 2
+    assert other.ByteSize() == 2
+    assert msg.ByteSize() == 22
+    assert msg._size_cache is cache
+
+    # assignment to a field of an embedded message invalidates the cached size
+    msg.repeated_message[0].uvarint = 300
+    assert msg.ByteSize() == serialized_size() == 23
+    msg.primitive = None
+    assert msg.ByteSize() == serialized_size() == 9
+
+    # so do in-place changes of repeated fields and bytes values
+    msg.repeated_message.append(PrimitiveMessage(bytes=b"\x00" * 3))
+    assert msg.ByteSize() == serialized_size() == 16
+    msg._add_repeated_message()
+    assert msg.ByteSize() == serialized_size() == 18
+    msg._extend_repeated_uvarint([1, 2])
+    assert msg.ByteSize() == serialized_size() == 22
+    msg.repeated_message[-1].bytes = bytearray(b"\x01")
+    msg.repeated_message[-1].bytes.extend(b"\x02")
+    assert msg.ByteSize() == serialized_size() == 26
+
+
+def test_lazy_decode():
+    msg = EmbeddedMessage(
+        primitive=PrimitiveMessage(uvarint=1),
+        repeated_uvarint=[2, 3],
+        repeated_message=[PrimitiveMessage(bytes=b"\x04"), PrimitiveMessage()],
+    )
+    buf = BytesIO()
+    protobuf.dump_message(buf, msg)
+    data = buf.getvalue()
+
+    retr = protobuf.decode(data, EmbeddedMessage, lazy=True)
+    # scalar fields are decoded eagerly, embedded messages are not
+    assert retr.repeated_uvarint == [2, 3]
+    assert sorted(retr._lazy) == ["primitive", "repeated_message"]
+
+    assert retr.primitive == msg.primitive
+    assert sorted(retr._lazy) == ["repeated_message"]
+    assert retr == msg
+
+    retr = protobuf.decode(data, EmbeddedMessage, zero_copy=True, lazy=True)
+    assert isinstance(retr.repeated_message[0].bytes, memoryview)
+    buf = BytesIO()
+    protobuf.dump_message(buf, retr)
+    assert buf.getvalue() == data
+
+
+def test_dict_roundtrip():
+    msg = EmbeddedMessage(
+        primitive=PrimitiveMessage(uvarint=1, svarint=-2, bytes=b"\x03\x04"),
+        repeated_message=[PrimitiveMessage(unicode="five"), PrimitiveMessage()],
+    )
+    d = protobuf.proto_to_dict(msg)
+    assert d == {
+        "primitive": {"uvarint": 1, "svarint": -2, "bytes": "0304"},
+        "repeated_message": [{"unicode": "five"}, {}],
+    }
+    assert protobuf.dict_to_proto(EmbeddedMessage, d) == msg
+
+
+def test_dict_camelcase():
+    d = {
+        "Primitive": {"Uvarint": "1", "Bool": 1},
+        "repeatedUvarint": [2, 3],
+        "RepeatedMessage": [{"Unicode": "four"}],
+    }
+    msg = protobuf.dict_to_proto(EmbeddedMessage, d, camelcase=True)
+    assert msg == EmbeddedMessage(
+        primitive=PrimitiveMessage(uvarint=1, bool=True),
+        repeated_uvarint=[2, 3],
+        repeated_message=[PrimitiveMessage(unicode="four")],
+    )
+    assert protobuf.proto_to_dict(msg, camelcase=True) == {
+        "primitive": {"uvarint": 1, "bool": True},
+        "repeatedUvarint": [2, 3],
+        "repeatedMessage": [{"unicode": "four"}],
+    }
+
+    renames = {"bool": "unicode"}
+    msg = protobuf.dict_to_proto(
+        PrimitiveMessage, {"Bool": "yes"}, camelcase=True, renames=renames
+    )
+    assert msg == PrimitiveMessage(unicode="yes")
+
+
+def test_packed_repeated():
+    msg = PackedMessage(
+        uvarints=array("I", [1, 0x80000000]), svarints=[-1, 1], bools=[]
+    )
+    buf = BytesIO()
+    protobuf.dump_message(buf, msg)
+    data = buf.getvalue()
+    assert data == b"\x0a\x06\x01\x80\x80\x80\x80\x08\x12\x02\x01\x02"
+    assert protobuf.message_size(msg) == len(data)
+
+    buf.seek(0)
+    retr = protobuf.load_message(buf, PackedMessage)
+    assert retr.uvarints == [1, 0x80000000]
+    assert retr.svarints == [-1, 1]
+    assert retr.bools == []
+    assert protobuf.decode(data, PackedMessage) == retr
+
+    # packed encoding is accepted even if the schema does not ask for it
+    retr = protobuf.decode(b"\x12\x03\x01\x02\x03", EmbeddedMessage)
+    assert retr.repeated_uvarint == [1, 2, 3]
+    # unpacked encoding is accepted for packed fields
+    retr = protobuf.decode(b"\x08\x01\x08\x02", PackedMessage)
+    assert retr.uvarints == [1, 2]
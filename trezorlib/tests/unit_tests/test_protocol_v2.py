@@ -0,0 +1,141 @@
+# This file is part of the Trezor project.
+#
+# Copyright (C) 2012-2018 SatoshiLabs and contributors
+#
+# This library is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3
+# as published by the Free Software Foundation.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the License along with this library.
+# If not, see <https://www.gnu.org/licenses/lgpl-3.0.html>.
+
+import queue
+import struct
+import threading
+import time
+
+from trezorlib import mapping, protobuf
+from trezorlib.protocol_v2 import ProtocolV2, SessionDemultiplexer
+
+
+class FakeTransport:
+    def __init__(self, reports=()):
+        self.incoming = queue.Queue()
+        for report in reports:
+            self.incoming.put(report)
+        self.written = []
+
+    def read_chunk(self):
+        return self.incoming.get(timeout=5)
+
+    def write_chunk(self, chunk):
+        self.written.append(bytes(chunk))
+
+
+def report(session, seq):
+    return struct.pack(">BLL", 0x02, session, seq).ljust(64, b"\x00")
+
+
+def test_demux_routes_reports():
+    transport = FakeTransport([report(2, 0), report(1, 0), report(2, 1)])
+    demux = SessionDemultiplexer()
+    demux.register(1)
+    demux.register(2)
+    assert demux.read_chunk(transport, 1) == report(1, 0)
+    # queued while reading for session 1
+    assert demux.read_chunk(transport, 2) == report(2, 0)
+    assert demux.read_chunk(transport, 2) == report(2, 1)
+    assert transport.incoming.empty()
+
+
+def test_demux_concurrent_sessions():
+    count = 50
+    reports = []
+    for seq in range(count):
+        reports += [report(1, seq), report(2, seq), report(3, seq)]
+    transport = FakeTransport(reports)
+    demux = SessionDemultiplexer()
+    received = {1: [], 2: [], 3: []}
+    for session in received:
+        demux.register(session)
+
+    def reader(session):
+        for _ in range(count):
+            received[session].append(demux.read_chunk(transport, session))
+
+    threads = [threading.Thread(target=reader, args=(s,)) for s in received]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for session, chunks in received.items():
+        assert chunks == [report(session, seq) for seq in range(count)]
+
+
+def test_session_open_while_reading():
+    demux = SessionDemultiplexer()
+    demux.register(1)
+    transport = FakeTransport([report(1, 0), b"\x03\x00\x00\x00\x07".ljust(64, b"\0")])
+    protocol = ProtocolV2(demux=demux)
+    protocol.session_begin(transport)
+    assert protocol.session == 7
+    assert transport.written == [b"\x03".ljust(64, b"\0")]
+    # the report for the other session is kept for it
+    assert demux.read_chunk(transport, 1) == report(1, 0)
+
+
+def test_demux_drops_unknown_sessions():
+    transport = FakeTransport([report(2, 0), report(3, 0), report(1, 0)])
+    demux = SessionDemultiplexer()
+    demux.register(1)
+    demux.register(2)
+    demux.discard(2)
+    assert demux.read_chunk(transport, 1) == report(1, 0)
+    assert not demux.queues
+
+
+class SlowTransport(FakeTransport):
+    def write_chunk(self, chunk):
+        # give other writers a chance to interleave
+        time.sleep(0.0001)
+        super().write_chunk(chunk)
+
+
+class Message(protobuf.MessageType):
+    @classmethod
+    def get_fields(cls):
+        return {1: ("data", protobuf.BytesType, 0)}
+
+
+def test_concurrent_writes(monkeypatch):
+    monkeypatch.setattr(mapping, "get_type", lambda msg: 1)
+    transport = SlowTransport()
+    demux = SessionDemultiplexer()
+    msg = Message(data=bytes(500))
+
+    def writer(session):
+        protocol = ProtocolV2(demux=demux)
+        protocol.session = session
+        for _ in range(5):
+            protocol.write(transport, msg)
+
+    threads = [threading.Thread(target=writer, args=(s,)) for s in (1, 2, 3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # the reports of every message are written one after another
+    written = transport.written
+    assert len(written) == 15 * 10
+    for i in range(0, len(written), 10):
+        message = written[i : i + 10]
+        assert message[0][0] == 0x01
+        session = message[0][1:5]
+        assert all(r[0] == 0x02 and r[1:5] == session for r in message[1:])
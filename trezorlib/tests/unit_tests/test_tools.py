@@ -0,0 +1,80 @@
+# This file is part of the Trezor project.
+#
+# Copyright (C) 2012-2018 SatoshiLabs and contributors
+#
+# This library is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3
+# as published by the Free Software Foundation.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the License along with this library.
+# If not, see <https://www.gnu.org/licenses/lgpl-3.0.html>.
+
+import pytest
+
+from trezorlib.tools import H_, parse_path_range
+
+
+def path_range(nstr):
+    return list(parse_path_range(nstr))
+
+
+def test_parse_path_range():
+    assert path_range("m/1/2") == [[1, 2]]
+    assert path_range("m/44h/0h/0h/0/0-2") == [
+        [H_(44), H_(0), H_(0), 0, 0],
+        [H_(44), H_(0), H_(0), 0, 1],
+        [H_(44), H_(0), H_(0), 0, 2],
+    ]
+    assert path_range("0/5-5") == [[0, 5]]
+
+
+def test_parse_path_range_hardened():
+    assert path_range("m/44h/0h-2h") == [
+        [H_(44), H_(0)],
+        [H_(44), H_(1)],
+        [H_(44), H_(2)],
+    ]
+    assert path_range("m/1'-2'/0") == [[H_(1), 0], [H_(2), 0]]
+    assert path_range("-1--2/0") == [[H_(1), 0], [H_(2), 0]]
+
+
+def test_parse_path_range_offset():
+    # "m/" and coin names change the position of the range in the result
+    assert path_range("0-1/7") == [[0, 7], [1, 7]]
+    assert path_range("m/0-1/7") == [[0, 7], [1, 7]]
+    assert path_range("Bitcoin/0h/0/0-1") == [
+        [H_(44), H_(0), H_(0), 0, 0],
+        [H_(44), H_(0), H_(0), 0, 1],
+    ]
+
+
+def test_parse_path_range_multiple():
+    assert path_range("m/0-1/5h/8-9") == [
+        [0, H_(5), 8],
+        [0, H_(5), 9],
+        [1, H_(5), 8],
+        [1, H_(5), 9],
+    ]
+
+
+@pytest.mark.parametrize(
+    "nstr",
+    [
+        "m/0h-2",  # mixed hardened and non-hardened ends
+        "m/0-2h",
+        "-1-2",
+        "m/5-1",  # reversed
+        "m/2h-1h",
+        "m/0-1-2",
+        "m/0-x",
+        "m/-",
+    ],
+)
+def test_parse_path_range_invalid(nstr):
+    with pytest.raises(ValueError):
+        path_range(nstr)
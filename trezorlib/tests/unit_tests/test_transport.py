@@ -14,9 +14,19 @@
 # You should have received a copy of the License along with this library.
 # If not, see <https://www.gnu.org/licenses/lgpl-3.0.html>.
 
+import threading
+import time
 from unittest import mock
 
-from trezorlib.transport import all_transports
+import pytest
+
+from trezorlib.transport import (
+    Transport,
+    TransportException,
+    all_transports,
+    iter_devices,
+)
+from trezorlib.transport.registry import DeviceRegistry
 
 
 def test_all_transports_without_hid():
@@ -27,3 +37,296 @@ def test_all_transports_without_hid():
         transports = all_transports()
         # there should now be less transports
         assert len(transports_ref) > len(transports)
+
+
+class FakeHidDevice:
+    def __init__(self):
+        self.reports = []
+        self.reads = 0
+
+    def read(self, length, timeout_ms=0):
+        self.reads += 1
+        if self.reports:
+            return self.reports.pop(0)
+        time.sleep(timeout_ms / 1000)
+        return []
+
+
+def hid_transport(read_timeout=None):
+    with mock.patch.dict("sys.modules", {"hid": mock.Mock()}):
+        from trezorlib.transport.hid import HidTransport
+
+    device = FakeHidDevice()
+    transport = HidTransport(
+        {"path": b"fake"},
+        protocol=mock.Mock(),
+        hid_handle=mock.Mock(handle=device),
+        read_timeout=read_timeout,
+    )
+    return transport, device
+
+
+def test_hid_read_chunk():
+    transport, device = hid_transport()
+    device.reports = [[1] * 64, [2] * 64]
+    assert transport.read_chunk() == bytearray([1] * 64)
+    assert transport.read_chunk() == bytearray([2] * 64)
+    assert device.reads == 2
+
+
+def test_hid_read_timeout():
+    transport, device = hid_transport(read_timeout=0.05)
+    start = time.monotonic()
+    with pytest.raises(TransportException):
+        transport.read_chunk()
+    assert 0.05 <= time.monotonic() - start < 1
+
+
+def test_hid_read_cancel():
+    transport, device = hid_transport()
+    threading.Timer(0.05, transport.cancel_read).start()
+    with pytest.raises(TransportException):
+        transport.read_chunk()
+    # cancellation applies to a single read
+    device.reports = [[3] * 64]
+    assert transport.read_chunk() == bytearray([3] * 64)
+
+
+class FakeTransfer:
+    def __init__(self, device):
+        self.device = device
+        self.submitted = False
+        self.cancelled = False
+
+    def setInterrupt(self, endpoint, buffer_or_len, callback):
+        self.endpoint = endpoint
+        self.buffer = buffer_or_len
+        self.callback = callback
+
+    def submit(self):
+        self.submitted = True
+        self.cancelled = False
+        self.device.transfers.append(self)
+
+    def cancel(self):
+        self.cancelled = True
+
+    def isSubmitted(self):
+        return self.submitted
+
+    def getStatus(self):
+        return self.status
+
+    def getActualLength(self):
+        return len(self.buffer)
+
+    def getBuffer(self):
+        return self.buffer
+
+    def close(self):
+        self.closed = True
+
+
+class FakeUsbDevice:
+    def __init__(self, usb1):
+        self.usb1 = usb1
+        self.transfers = []
+        self.reports = []
+        self.written = []
+        self.in_status = None  # status of failing IN transfers
+
+    def getTransfer(self):
+        return FakeTransfer(self)
+
+    def handleEventsTimeout(self, tv):
+        transfers, self.transfers = self.transfers, []
+        for transfer in transfers:
+            if transfer.cancelled:
+                transfer.status = self.usb1.TRANSFER_CANCELLED
+            elif transfer.endpoint & 0x80 and self.in_status is not None:
+                transfer.status = self.in_status
+            elif transfer.endpoint & 0x80 and self.reports:
+                transfer.buffer = self.reports.pop(0)
+                transfer.status = self.usb1.TRANSFER_COMPLETED
+            elif not transfer.endpoint & 0x80:
+                self.written.append(transfer.buffer)
+                transfer.status = self.usb1.TRANSFER_COMPLETED
+            else:
+                self.transfers.append(transfer)
+                continue
+            transfer.submitted = False
+            transfer.callback(transfer)
+
+
+def test_webusb_async_transfers():
+    with mock.patch.dict("sys.modules", {"usb1": mock.Mock()}):
+        from trezorlib.transport import webusb
+
+    device = FakeUsbDevice(webusb.usb1)
+    transfers = webusb.AsyncTransfers(device, device, webusb.ENDPOINT)
+    assert len(device.transfers) == webusb.IN_TRANSFERS
+
+    chunk = bytearray(64)
+    for i in range(10):
+        chunk[0] = i
+        transfers.write(chunk)
+    device.reports = [bytes([i] * 64) for i in range(10)]
+    for i in range(10):
+        assert transfers.read() == bytearray([i] * 64)
+    assert [report[0] for report in device.written] == list(range(10))
+
+    transfers.close()
+    assert not any(t.isSubmitted() for t in transfers.in_transfers)
+
+
+def webusb_transfers(timeout=None):
+    with mock.patch.dict("sys.modules", {"usb1": mock.Mock()}):
+        from trezorlib.transport import webusb
+
+    device = FakeUsbDevice(webusb.usb1)
+    transfers = webusb.AsyncTransfers(device, device, webusb.ENDPOINT, timeout)
+    return webusb.usb1, device, transfers
+
+
+def test_webusb_transfers_use_device_context():
+    with mock.patch.dict("sys.modules", {"usb1": mock.Mock()}):
+        from trezorlib.transport import webusb
+
+    context = FakeUsbDevice(webusb.usb1)
+    handle = mock.Mock(handle=context, transfers=None)
+    transport = webusb.WebUsbTransport(
+        mock.Mock(),
+        protocol=webusb.ProtocolV1(),
+        handle=handle,
+        async_transfers=True,
+        context=context,
+    )
+    transport.open()
+    assert handle.transfers.context is context
+    assert transport.find_debug().context is context
+
+
+def test_webusb_async_failed_in_transfers():
+    usb1, device, transfers = webusb_transfers()
+    device.in_status = 1  # LIBUSB_TRANSFER_ERROR
+    with pytest.raises(TransportException):
+        transfers.read()
+    # failed transfers are submitted again
+    device.in_status = None
+    device.handleEventsTimeout(0)
+    assert len(device.transfers) == len(transfers.in_transfers)
+    device.reports = [bytes(64)]
+    assert transfers.read() == bytearray(64)
+
+
+def test_webusb_async_disconnect():
+    usb1, device, transfers = webusb_transfers()
+    device.in_status = usb1.TRANSFER_NO_DEVICE
+    for _ in range(3):
+        with pytest.raises(TransportException):
+            transfers.read()
+    with pytest.raises(TransportException):
+        transfers.write(bytes(64))
+    assert not device.transfers
+
+
+def test_webusb_async_timeout():
+    usb1, device, transfers = webusb_transfers(timeout=0.05)
+    start = time.monotonic()
+    with pytest.raises(TransportException):
+        transfers.read()
+    assert 0.05 <= time.monotonic() - start < 1
+
+    transfers.free_out_transfers.clear()
+    with pytest.raises(TransportException):
+        transfers.write(bytes(64))
+
+
+def test_bridge_connection_reuse():
+    from trezorlib.transport import bridge
+
+    sessions = []
+
+    def new_session():
+        session = mock.Mock()
+        session.post.return_value = mock.Mock(
+            status_code=200, content=b"[]", json=mock.Mock(return_value=[])
+        )
+        sessions.append(session)
+        return session
+
+    bridge.STATS.reset()
+    with mock.patch.object(bridge, "_local", threading.local()), mock.patch.object(
+        bridge.requests, "Session", new_session
+    ):
+        assert bridge.BridgeTransport.enumerate() == []
+        assert bridge.BridgeTransport.enumerate() == []
+        # another thread gets a session of its own
+        thread = threading.Thread(target=bridge.BridgeTransport.enumerate)
+        thread.start()
+        thread.join()
+
+    assert len(sessions) == 2
+    assert sessions[0].post.call_count == 2
+    assert sessions[1].post.call_count == 1
+    assert bridge.STATS.actions["enumerate"][0] == 3
+
+
+class FakeTransport(Transport):
+    PATH_PREFIX = "fake"
+    found = []
+
+    def __init__(self, device):
+        super().__init__()
+        self.device = device
+
+    def get_serial_number(self):
+        return "serial-" + self.device
+
+    @classmethod
+    def enumerate(cls):
+        return [cls(device) for device in cls.found]
+
+
+def test_registry():
+    FakeTransport.found = ["a"]
+    with DeviceRegistry([FakeTransport], poll_interval=0.01) as registry:
+        first = registry.get_transport()
+        assert first.get_path() == "fake:a"
+        assert registry.find_by_serial("serial-a") is first
+
+        FakeTransport.found = ["a", "b"]
+        time.sleep(0.1)
+        assert registry.find_by_path("fake:a") is first
+        assert registry.find_by_path("fake:b", prefix_search=True)
+
+        FakeTransport.found = []
+        time.sleep(0.1)
+        assert registry.devices() == []
+        with pytest.raises(TransportException):
+            registry.find_by_serial("serial-a")
+
+
+class SlowTransport(FakeTransport):
+    PATH_PREFIX = "slow"
+    ENUMERATE_TIMEOUT = 0.1
+
+    @classmethod
+    def enumerate(cls):
+        time.sleep(1)
+        return [cls("late")]
+
+
+def test_iter_devices_parallel():
+    FakeTransport.found = ["a"]
+    with mock.patch(
+        "trezorlib.transport.all_transports",
+        return_value={FakeTransport, SlowTransport},
+    ):
+        start = time.monotonic()
+        devices = iter_devices()
+        assert next(devices).get_path() == "fake:a"
+        assert time.monotonic() - start < 0.5
+        # the slow transport is dropped after its timeout
+        assert list(devices) == []
+        assert time.monotonic() - start < 0.5
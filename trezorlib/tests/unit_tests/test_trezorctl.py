@@ -0,0 +1,51 @@
+# This file is part of the Trezor project.
+#
+# Copyright (C) 2012-2018 SatoshiLabs and contributors
+#
+# This library is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3
+# as published by the Free Software Foundation.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the License along with this library.
+# If not, see <https://www.gnu.org/licenses/lgpl-3.0.html>.
+
+import importlib.util
+import json
+import os
+from importlib.machinery import SourceFileLoader
+
+from trezorlib import protobuf
+
+TREZORCTL = os.path.join(os.path.dirname(__file__), "..", "..", "..", "trezorctl")
+
+
+class Message(protobuf.MessageType):
+    @classmethod
+    def get_fields(cls):
+        return {
+            1: ("label", protobuf.UnicodeType, 0),
+            2: ("data", protobuf.BytesType, 0),
+            3: ("numbers", protobuf.UVarintType, protobuf.FLAG_REPEATED),
+        }
+
+
+def load_trezorctl():
+    loader = SourceFileLoader("trezorctl", TREZORCTL)
+    spec = importlib.util.spec_from_loader("trezorctl", loader)
+    module = importlib.util.module_from_spec(spec)
+    loader.exec_module(module)
+    return module
+
+
+def test_print_result_json(capsys):
+    trezorctl = load_trezorctl()
+    msg = Message(label="hello", data=b"\x01\x02", numbers=[3, 4])
+    trezorctl.print_result(msg, path=None, verbose=False, is_json=True)
+    assert json.loads(capsys.readouterr().out) == {
+        "Message": {"label": "hello", "data": "0102", "numbers": [3, 4]}
+    }
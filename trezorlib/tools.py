@@ -16,13 +16,14 @@
 
 import functools
 import hashlib
-import re
+import itertools
 import struct
 import unicodedata
-from typing import List, NewType
+from typing import Iterator, List, NewType
 
 from .coins import slip44
 from .exceptions import TrezorException
+from .protobuf import from_camelcase
 
 CallException = TrezorException
 
@@ -167,6 +168,46 @@ def parse_path(nstr: str) -> Address:
         raise ValueError("Invalid BIP32 path", nstr)
 
 
+def parse_path_range(nstr: str) -> Iterator[Address]:
+    """
+    Expand BIP32 path string with ranges of indices to all the paths it covers.
+    A range is written as "first-last", both included; hardened ranges have
+    the hardened flag on both ends.  Other components are parsed as in
+    `parse_path`.
+
+    e.g.: "m/44h/0h/0h/0/0-2" -> [.., 0, 0], [.., 0, 1], [.., 0, 2]
+
+    :param nstr: path string
+    :return: iterator of lists of integers
+    """
+    n = nstr.split("/")
+    ranges = []
+    for i, x in enumerate(n):
+        if "-" not in x[1:]:
+            continue
+        split = x.index("-", 1)
+        first, last = parse_path(x[:split]), parse_path(x[split + 1 :])
+        if (
+            len(first) != 1
+            or len(last) != 1
+            or (first[0] ^ last[0]) & HARDENED_FLAG
+            or last[0] < first[0]
+        ):
+            raise ValueError("Invalid BIP32 path range", nstr)
+        ranges.append((i, range(first[0], last[0] + 1)))
+        n[i] = x[:split]
+
+    base = parse_path("/".join(n))
+    # "m/" and coin names change the length before the first range
+    offset = len(base) - len(n)
+    indices = [i + offset for i, _ in ranges]
+    for values in itertools.product(*(r for _, r in ranges)):
+        path = list(base)
+        for i, value in zip(indices, values):
+            path[i] = value
+        yield path
+
+
 def normalize_nfc(txt):
     """
     Normalize message to NFC and return bytes suitable for protobuf.
@@ -209,27 +250,15 @@ def session(f):
     def wrapped_f(*args, **kwargs):
         __tracebackhide__ = True  # for pytest # pylint: disable=W0612
         client = args[0]
-        client.transport.session_begin()
+        client.session_begin()
         try:
             return f(*args, **kwargs)
         finally:
-            client.transport.session_end()
+            client.session_end()
 
     return wrapped_f
 
 
-# de-camelcasifier
-# https://stackoverflow.com/a/1176023/222189
-
-FIRST_CAP_RE = re.compile("(.)([A-Z][a-z]+)")
-ALL_CAP_RE = re.compile("([a-z0-9])([A-Z])")
-
-
-def from_camelcase(s):
-    s = FIRST_CAP_RE.sub(r"\1_\2", s)
-    return ALL_CAP_RE.sub(r"\1_\2", s).lower()
-
-
 def dict_from_camelcase(d, renames=None):
     if not isinstance(d, dict):
         return d
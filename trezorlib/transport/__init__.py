@@ -16,16 +16,27 @@
 
 import importlib
 import logging
-from typing import Iterable, Type
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Iterable, Iterator, Type
 
 LOG = logging.getLogger(__name__)
 
+# Deadline of a whole enumeration across all transports, in seconds
+ENUMERATE_TIMEOUT = 10.0
+
 
 class TransportException(Exception):
     pass
 
 
 class Transport(object):
+    # Longest time enumerate() may take, in seconds, or None for no limit
+    # other than the deadline of the whole enumeration
+    ENUMERATE_TIMEOUT = None
+    # Number of messages that may be written before reading the first response
+    PIPELINE_DEPTH = 1
+
     def __init__(self):
         self.session_counter = 0
 
@@ -51,10 +62,23 @@ class Transport(object):
     def close(self):
         raise NotImplementedError
 
+    def get_serial_number(self):
+        return None
+
     @classmethod
     def enumerate(cls):
         raise NotImplementedError
 
+    @classmethod
+    def wait_for_changes(cls, devices, timeout):
+        """
+        Wait until the connected devices may differ from `devices`, the result
+        of a previous `enumerate()`.  Returns False if `timeout` seconds passed
+        without a change.  Transports that cannot be watched raise
+        NotImplementedError and are polled instead.
+        """
+        raise NotImplementedError
+
     @classmethod
     def find_by_path(cls, path, prefix_search=False):
         for device in cls.enumerate():
@@ -88,35 +112,84 @@ def all_transports() -> Iterable[Type[Transport]]:
     return transports
 
 
-def enumerate_devices() -> Iterable[Transport]:
-    devices = []  # type: List[Transport]
-    for transport in all_transports():
-        try:
-            found = transport.enumerate()
-            LOG.info(
-                "Enumerating {}: found {} devices".format(
-                    transport.__name__, len(found)
-                )
+def _enumerate_transport(transport: Type[Transport]) -> Iterable[Transport]:
+    start = time.monotonic()
+    try:
+        found = transport.enumerate()
+        LOG.info(
+            "Enumerating {}: found {} devices in {:.0f} ms".format(
+                transport.__name__, len(found), (time.monotonic() - start) * 1000
             )
-            devices.extend(found)
-        except NotImplementedError:
-            LOG.error(
-                "{} does not implement device enumeration".format(transport.__name__)
+        )
+        return found
+    except NotImplementedError:
+        LOG.error("{} does not implement device enumeration".format(transport.__name__))
+    except Exception as e:
+        LOG.error(
+            "Failed to enumerate {} after {:.0f} ms. {}: {}".format(
+                transport.__name__,
+                (time.monotonic() - start) * 1000,
+                e.__class__.__name__,
+                e,
             )
-        except Exception as e:
-            LOG.error(
-                "Failed to enumerate {}. {}: {}".format(
-                    transport.__name__, e.__class__.__name__, e
-                )
+        )
+    return []
+
+
+def iter_devices(timeout: float = ENUMERATE_TIMEOUT) -> Iterator[Transport]:
+    """
+    Enumerate all transports concurrently and yield devices as they are found.
+
+    Transports that have not answered within their ENUMERATE_TIMEOUT, or when
+    `timeout` seconds have passed since the start, are skipped with a warning.
+    Stopping the iteration early does not wait for the remaining transports.
+    """
+    transports = all_transports()
+    start = time.monotonic()
+    pool = ThreadPoolExecutor(max_workers=max(len(transports), 1))
+    deadlines = {}
+    for transport in transports:
+        deadline = start + timeout
+        if transport.ENUMERATE_TIMEOUT is not None:
+            deadline = min(deadline, start + transport.ENUMERATE_TIMEOUT)
+        future = pool.submit(_enumerate_transport, transport)
+        deadlines[future] = (transport, deadline)
+
+    try:
+        while deadlines:
+            next_deadline = min(deadline for _, deadline in deadlines.values())
+            done, _ = wait(
+                deadlines,
+                timeout=max(next_deadline - time.monotonic(), 0),
+                return_when=FIRST_COMPLETED,
             )
-    return devices
+            for future in done:
+                del deadlines[future]
+                yield from future.result()
+            now = time.monotonic()
+            for future, (transport, deadline) in list(deadlines.items()):
+                if deadline <= now and not future.done():
+                    LOG.warning(
+                        "Enumerating {}: no answer in {:.0f} ms".format(
+                            transport.__name__, (now - start) * 1000
+                        )
+                    )
+                    del deadlines[future]
+    finally:
+        for future in deadlines:
+            future.cancel()
+        pool.shutdown(wait=False)
+
+
+def enumerate_devices(timeout: float = ENUMERATE_TIMEOUT) -> Iterable[Transport]:
+    return list(iter_devices(timeout))
 
 
 def get_transport(path: str = None, prefix_search: bool = False) -> Transport:
     if path is None:
         try:
-            return next(iter(enumerate_devices()))
-        except IndexError:
+            return next(iter_devices())
+        except StopIteration:
             raise Exception("No TREZOR device found") from None
 
     # Find whether B is prefix of A (transport name is part of the path)
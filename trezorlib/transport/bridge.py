@@ -14,8 +14,12 @@
 # You should have received a copy of the License along with this library.
 # If not, see <https://www.gnu.org/licenses/lgpl-3.0.html>.
 
+import json
 import logging
 import struct
+import threading
+import time
+from collections import defaultdict
 from io import BytesIO
 
 import requests
@@ -27,20 +31,75 @@ LOG = logging.getLogger(__name__)
 
 TREZORD_HOST = "http://127.0.0.1:21325"
 
+_local = threading.local()
+
+
+def get_session():
+    """
+    Return the HTTP session that bridge transports use on the current thread.
+
+    The session keeps connections to trezord alive, so that calls do not pay
+    for a new TCP connection each.  `requests.Session` is not thread-safe, so
+    every thread gets a session of its own.
+    """
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = _local.session = requests.Session()
+    return session
+
+
+class CallStats:
+    """
+    Number, total duration and payload sizes of trezord calls, per action.
+    """
+
+    def __init__(self):
+        self.actions = defaultdict(lambda: [0, 0.0, 0, 0])
+        self.lock = threading.Lock()
+
+    def add(self, action, seconds, sent, received):
+        with self.lock:
+            stats = self.actions[action]
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] += sent
+            stats[3] += received
+
+    def reset(self):
+        with self.lock:
+            self.actions.clear()
+
+    def __str__(self):
+        lines = []
+        for action, (calls, seconds, sent, received) in sorted(self.actions.items()):
+            lines.append(
+                "{}: {} calls, {:.1f} ms avg, {} bytes sent, {} bytes received".format(
+                    action, calls, seconds / calls * 1000, sent, received
+                )
+            )
+        return "\n".join(lines)
+
+
+# calls of all bridge transports in this process
+STATS = CallStats()
+
 
 class BridgeTransport(Transport):
     """
     BridgeTransport implements transport through TREZOR Bridge (aka trezord).
+
+    `stats` collects timings of the calls made by this transport.
     """
 
     PATH_PREFIX = "bridge"
     HEADERS = {"Origin": "https://python.trezor.io"}
+    ENUMERATE_TIMEOUT = 2.0
 
     def __init__(self, device):
         super().__init__()
 
         self.device = device
-        self.conn = requests.Session()
+        self.stats = CallStats()
         self.session = None
         self.request = None
 
@@ -48,7 +107,15 @@ class BridgeTransport(Transport):
         return "%s:%s" % (self.PATH_PREFIX, self.device["path"])
 
     @classmethod
-    def _call(cls, action, data=None, uri_suffix=None, session=None):
+    def _call(
+        cls,
+        action,
+        data=None,
+        uri_suffix=None,
+        session=None,
+        stats=None,
+        timeout=None,
+    ):
         if uri_suffix is not None:
             uri_suffix = "/" + uri_suffix
         elif session is not None:
@@ -57,7 +124,15 @@ class BridgeTransport(Transport):
             uri_suffix = ""
 
         url = "{}/{}{}".format(TREZORD_HOST, action, uri_suffix)
-        r = requests.post(url, headers=cls.HEADERS, data=data)
+        start = time.perf_counter()
+        r = get_session().post(url, headers=cls.HEADERS, data=data, timeout=timeout)
+        elapsed = time.perf_counter() - start
+
+        sent = len(data) if data is not None else 0
+        STATS.add(action, elapsed, sent, len(r.content))
+        if stats is not None:
+            stats.add(action, elapsed, sent, len(r.content))
+        LOG.debug("trezord: '{}' took {:.1f} ms".format(action, elapsed * 1000))
 
         if r.status_code != 200:
             raise TransportException(
@@ -70,19 +145,33 @@ class BridgeTransport(Transport):
     @classmethod
     def enumerate(cls):
         try:
-            r = cls._call("enumerate")
+            r = cls._call("enumerate", timeout=cls.ENUMERATE_TIMEOUT)
             return [BridgeTransport(dev) for dev in r.json()]
         except Exception:
             return []
 
+    @classmethod
+    def wait_for_changes(cls, devices, timeout):
+        # trezord answers `listen` once its device list differs from ours
+        data = json.dumps([device.device for device in devices])
+        try:
+            cls._call("listen", data=data, timeout=timeout)
+        except requests.Timeout:
+            return False
+        return True
+
     def open(self):
-        r = self._call("acquire", uri_suffix="{}/null".format(self.device["path"]))
+        r = self._call(
+            "acquire",
+            uri_suffix="{}/null".format(self.device["path"]),
+            stats=self.stats,
+        )
         self.session = r.json()["session"]
 
     def close(self):
         if not self.session:
             return
-        self._call("release", session=self.session)
+        self._call("release", session=self.session, stats=self.stats)
         self.session = None
 
     def write(self, msg):
@@ -107,13 +196,15 @@ class BridgeTransport(Transport):
 
         try:
             LOG.debug("sending prepared message")
-            r = self._call("call", data=self.request, session=self.session)
+            r = self._call(
+                "call", data=self.request, session=self.session, stats=self.stats
+            )
 
             data = bytes.fromhex(r.text)
             headerlen = struct.calcsize(">HL")
             msg_type, datalen = struct.unpack(">HL", data[:headerlen])
-            data = BytesIO(data[headerlen : headerlen + datalen])
-            msg = protobuf.load_message(data, mapping.get_class(msg_type))
+            data = memoryview(data)[headerlen : headerlen + datalen]
+            msg = protobuf.decode(data, mapping.get_class(msg_type))
             LOG.debug(
                 "received message: {}".format(msg.__class__.__name__),
                 extra={"protobuf": msg},
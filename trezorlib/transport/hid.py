@@ -14,7 +14,9 @@
 # You should have received a copy of the License along with this library.
 # If not, see <https://www.gnu.org/licenses/lgpl-3.0.html>.
 
+import math
 import sys
+import threading
 import time
 
 import hid
@@ -27,6 +29,9 @@ DEV_TREZOR1 = (0x534C, 0x0001)
 DEV_TREZOR2 = (0x1209, 0x53C1)
 DEV_TREZOR2_BL = (0x1209, 0x53C0)
 
+# Longest time a blocking read waits before checking for cancellation, in ms
+READ_CANCEL_CHECK_MS = 100
+
 
 class HidHandle:
     def __init__(self, path):
@@ -58,11 +63,16 @@ class HidHandle:
 class HidTransport(Transport):
     """
     HidTransport implements transport over USB HID interface.
+
+    Reads block until a report arrives.  They give up with a
+    `TransportException` after `read_timeout` seconds, if it is set, or when
+    `cancel_read()` is called from another thread.
     """
 
     PATH_PREFIX = "hid"
+    PIPELINE_DEPTH = 4
 
-    def __init__(self, device, protocol=None, hid_handle=None):
+    def __init__(self, device, protocol=None, hid_handle=None, read_timeout=None):
         super(HidTransport, self).__init__()
 
         if hid_handle is None:
@@ -81,6 +91,8 @@ class HidTransport(Transport):
         self.protocol = protocol
         self.hid = hid_handle
         self.hid_version = None
+        self.read_timeout = read_timeout
+        self.read_cancelled = threading.Event()
 
     def get_path(self):
         return "%s:%s" % (self.PATH_PREFIX, self.device["path"].decode())
@@ -100,10 +112,13 @@ class HidTransport(Transport):
             devices.append(HidTransport(dev))
         return devices
 
+    def get_serial_number(self):
+        return self.device["serial_number"]
+
     def find_debug(self):
         if isinstance(self.protocol, ProtocolV2):
             # For v2 protocol, lets use the same HID interface, but with a different session
-            protocol = ProtocolV2()
+            protocol = ProtocolV2(demux=self.protocol.demux)
             debug = HidTransport(self.device, protocol, self.hid)
             return debug
         if isinstance(self.protocol, ProtocolV1):
@@ -140,13 +155,27 @@ class HidTransport(Transport):
         else:
             self.hid.handle.write(chunk)
 
+    def cancel_read(self):
+        """Make the pending or the next `read_chunk()` call fail."""
+        self.read_cancelled.set()
+
     def read_chunk(self):
+        if self.read_timeout is not None:
+            deadline = time.monotonic() + self.read_timeout
         while True:
-            chunk = self.hid.handle.read(64)
+            if self.read_cancelled.is_set():
+                self.read_cancelled.clear()
+                raise TransportException("Read cancelled")
+            timeout_ms = READ_CANCEL_CHECK_MS
+            if self.read_timeout is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TransportException("Read timed out")
+                timeout_ms = min(timeout_ms, math.ceil(remaining * 1000))
+            # returns as soon as a report arrives
+            chunk = self.hid.handle.read(64, timeout_ms)
             if chunk:
                 break
-            else:
-                time.sleep(0.001)
         if len(chunk) != 64:
             raise TransportException("Unexpected chunk size: %d" % len(chunk))
         return bytearray(chunk)
@@ -0,0 +1,188 @@
+# This file is part of the Trezor project.
+#
+# Copyright (C) 2012-2018 SatoshiLabs and contributors
+#
+# This library is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3
+# as published by the Free Software Foundation.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the License along with this library.
+# If not, see <https://www.gnu.org/licenses/lgpl-3.0.html>.
+
+import logging
+import threading
+from typing import Iterable, List, Optional, Type
+
+from . import Transport, TransportException, all_transports
+
+LOG = logging.getLogger(__name__)
+
+# Seconds between enumerations of transports that cannot be watched
+POLL_INTERVAL = 5.0
+
+
+class DeviceRegistry:
+    """
+    Long-lived view of the connected devices of all transports.
+
+    All transports are enumerated once by `start()`.  Afterwards, every
+    transport is watched in a background thread through its
+    `wait_for_changes()`: libusb hotplug events for WebUSB, trezord's `listen`
+    call for the bridge.  Transports that cannot be watched, such as HID and
+    UDP, are enumerated again every `poll_interval` seconds.
+
+    Lookups are answered from memory.  A device that stays connected keeps
+    the same Transport instance.
+    """
+
+    def __init__(
+        self,
+        transports: Iterable[Type[Transport]] = None,
+        poll_interval: float = POLL_INTERVAL,
+    ) -> None:
+        if transports is None:
+            transports = all_transports()
+        self.transports = list(transports)
+        self.poll_interval = poll_interval
+        self.lock = threading.Condition()
+        self.by_transport = {t: {} for t in self.transports}
+        self.by_path = {}
+        self.by_serial = {}
+        self.stop = threading.Event()
+        self.threads = []
+
+    def __enter__(self) -> "DeviceRegistry":
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def start(self) -> "DeviceRegistry":
+        for transport in self.transports:
+            self._enumerate(transport)
+        for transport in self.transports:
+            thread = threading.Thread(
+                target=self._watch,
+                args=(transport,),
+                name="registry-" + transport.PATH_PREFIX,
+                daemon=True,
+            )
+            thread.start()
+            self.threads.append(thread)
+        return self
+
+    def close(self) -> None:
+        self.stop.set()
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+
+    def _enumerate(self, transport: Type[Transport]) -> None:
+        try:
+            found = transport.enumerate()
+        except NotImplementedError:
+            LOG.error(
+                "{} does not implement device enumeration".format(transport.__name__)
+            )
+            return
+        except Exception as e:
+            LOG.error(
+                "Failed to enumerate {}. {}: {}".format(
+                    transport.__name__, e.__class__.__name__, e
+                )
+            )
+            return
+        self._update(transport, found)
+
+    def _update(self, transport: Type[Transport], found: List[Transport]) -> None:
+        old = self.by_transport[transport]
+        new = {}
+        serials = {}
+        for device in found:
+            path = device.get_path()
+            if path in old:
+                new[path] = old[path]
+                continue
+            new[path] = device
+            try:
+                serials[path] = device.get_serial_number()
+            except Exception as e:
+                LOG.info("Failed to read serial number of {}: {}".format(path, e))
+
+        with self.lock:
+            for path in old.keys() - new.keys():
+                device = self.by_path.pop(path)
+                LOG.info("Device disconnected: {}".format(path))
+                for serial, known in list(self.by_serial.items()):
+                    if known is device:
+                        del self.by_serial[serial]
+            for path, device in new.items():
+                if path not in old:
+                    LOG.info("Device connected: {}".format(path))
+                self.by_path[path] = device
+            for path, serial in serials.items():
+                if serial:
+                    self.by_serial.setdefault(serial, new[path])
+            self.by_transport[transport] = new
+            self.lock.notify_all()
+
+    def _watch(self, transport: Type[Transport]) -> None:
+        while not self.stop.is_set():
+            devices = list(self.by_transport[transport].values())
+            try:
+                changed = transport.wait_for_changes(devices, self.poll_interval)
+            except NotImplementedError:
+                changed = not self.stop.wait(self.poll_interval)
+            except Exception as e:
+                LOG.info(
+                    "Failed to watch {}. {}: {}".format(
+                        transport.__name__, e.__class__.__name__, e
+                    )
+                )
+                changed = not self.stop.wait(self.poll_interval)
+            if changed and not self.stop.is_set():
+                self._enumerate(transport)
+
+    def devices(self) -> List[Transport]:
+        with self.lock:
+            return list(self.by_path.values())
+
+    def find_by_path(self, path: str, prefix_search: bool = False) -> Transport:
+        with self.lock:
+            if path in self.by_path:
+                return self.by_path[path]
+            if prefix_search:
+                for device_path, device in self.by_path.items():
+                    if device_path.startswith(path):
+                        return device
+        raise TransportException("Device not found: {}".format(path))
+
+    def find_by_serial(self, serial: str) -> Transport:
+        with self.lock:
+            try:
+                return self.by_serial[serial]
+            except KeyError:
+                pass
+        raise TransportException("Device not found: {}".format(serial))
+
+    def get_transport(self, path: str = None, prefix_search: bool = False) -> Transport:
+        """Same as `transport.get_transport()`, without enumerating devices."""
+        if path is not None:
+            return self.find_by_path(path, prefix_search=prefix_search)
+        with self.lock:
+            for device in self.by_path.values():
+                return device
+        raise TransportException("No TREZOR device found")
+
+    def wait_for_device(self, timeout: float = None) -> Optional[Transport]:
+        """Return the first connected device, waiting up to `timeout` seconds."""
+        with self.lock:
+            self.lock.wait_for(lambda: self.by_path, timeout)
+            for device in self.by_path.values():
+                return device
+        return None
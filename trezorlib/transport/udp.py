@@ -25,6 +25,8 @@ class UdpTransport(Transport):
     DEFAULT_HOST = "127.0.0.1"
     DEFAULT_PORT = 21324
     PATH_PREFIX = "udp"
+    ENUMERATE_TIMEOUT = 1.0
+    PIPELINE_DEPTH = 4
 
     def __init__(self, device=None, protocol=None):
         super(UdpTransport, self).__init__()
@@ -50,10 +52,12 @@ class UdpTransport(Transport):
         return UdpTransport("{}:{}".format(host, port + 1), self.protocol)
 
     @classmethod
-    def _try_path(cls, path):
+    def _try_path(cls, path, timeout=None):
         d = cls(path)
         try:
             d.open()
+            if timeout is not None:
+                d.socket.settimeout(timeout)
             if d._ping():
                 return d
             else:
@@ -67,7 +71,7 @@ class UdpTransport(Transport):
     def enumerate(cls):
         default_path = "{}:{}".format(cls.DEFAULT_HOST, cls.DEFAULT_PORT)
         try:
-            return [cls._try_path(default_path)]
+            return [cls._try_path(default_path, timeout=cls.ENUMERATE_TIMEOUT)]
         except TransportException:
             return []
 
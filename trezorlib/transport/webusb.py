@@ -17,6 +17,7 @@
 import atexit
 import sys
 import time
+from collections import deque
 
 import usb1
 
@@ -33,12 +34,149 @@ ENDPOINT = 1
 DEBUG_INTERFACE = 1
 DEBUG_ENDPOINT = 2
 
+# Number of IN transfers kept submitted in asynchronous mode
+IN_TRANSFERS = 4
+# Number of OUT transfers that can be in flight at once in asynchronous mode
+OUT_TRANSFERS = 4
+# Longest wait for USB events in one handleEventsTimeout call, in seconds
+EVENT_TIMEOUT = 0.1
+
+
+class AsyncTransfers:
+    """
+    Asynchronous interrupt transfers on one endpoint pair of an open device.
+
+    Several IN transfers are kept submitted at all times, so that reports are
+    picked up as soon as the device sends them, and OUT reports are submitted
+    without waiting for the previous ones to complete.  The transfers are
+    completed by libusb events, which are handled inside `read()`, `write()`
+    and `close()`.
+
+    A failed transfer raises a `TransportException` from the next `read()` or
+    `write()`.  Failed IN transfers are submitted again, unless the device is
+    gone; then every later `read()` and `write()` fails.  With `timeout` set,
+    `read()` and `write()` give up after that many seconds.
+
+    `context` must be the libusb context that `handle` was opened in.  It may
+    be shared with other transports and with `WebUsbTransport.wait_for_changes()`
+    on other threads.  libusb lets one thread handle events at a time, and that
+    thread runs the callbacks of every transfer on the context.  The callbacks
+    only append to deques and replace single attributes, so they are safe to
+    run on any thread; a report completed by another thread is picked up when
+    the current wait for events returns, within `EVENT_TIMEOUT`.
+    """
+
+    def __init__(self, context, handle, endpoint, timeout=None):
+        self.context = context
+        self.endpoint = endpoint
+        self.timeout = timeout
+        self.received = deque()
+        self.error = None
+        self.dead = None  # exception raised by every call once the device is gone
+        self.closing = False
+        self.in_transfers = []
+        self.free_out_transfers = []
+        for _ in range(IN_TRANSFERS):
+            transfer = handle.getTransfer()
+            transfer.setInterrupt(0x80 | endpoint, 64, callback=self._in_done)
+            transfer.submit()
+            self.in_transfers.append(transfer)
+        for _ in range(OUT_TRANSFERS):
+            self.free_out_transfers.append(handle.getTransfer())
+        self.out_transfers = list(self.free_out_transfers)
+
+    def _in_done(self, transfer):
+        status = transfer.getStatus()
+        if status == usb1.TRANSFER_CANCELLED or self.closing:
+            return
+        if status == usb1.TRANSFER_COMPLETED:
+            data = transfer.getBuffer()[: transfer.getActualLength()]
+            self.received.append(bytearray(data))
+        elif status == usb1.TRANSFER_NO_DEVICE:
+            self.dead = TransportException("Device disconnected")
+            return
+        else:
+            self.error = TransportException("IN transfer failed: %d" % status)
+        try:
+            transfer.submit()
+        except usb1.USBError as e:
+            self.dead = TransportException("Cannot resubmit IN transfer: %s" % e)
+
+    def _out_done(self, transfer):
+        self.free_out_transfers.append(transfer)
+        status = transfer.getStatus()
+        if status == usb1.TRANSFER_NO_DEVICE:
+            self.dead = TransportException("Device disconnected")
+        elif status != usb1.TRANSFER_COMPLETED:
+            self.error = TransportException("OUT transfer failed: %d" % status)
+
+    def _handle_events(self, deadline):
+        timeout = EVENT_TIMEOUT
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TransportException("Transfer timed out")
+            timeout = min(timeout, remaining)
+        self.context.handleEventsTimeout(timeout)
+        self._check()
+
+    def _check(self):
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+        if self.dead is not None:
+            raise self.dead
+
+    def _deadline(self):
+        if self.timeout is None:
+            return None
+        return time.monotonic() + self.timeout
+
+    def write(self, chunk):
+        self._check()
+        deadline = self._deadline()
+        while not self.free_out_transfers:
+            self._handle_events(deadline)
+        transfer = self.free_out_transfers.pop()
+        # the caller may reuse its buffer, so the data is copied
+        transfer.setInterrupt(self.endpoint, bytes(chunk), callback=self._out_done)
+        transfer.submit()
+
+    def read(self):
+        if not self.received:
+            self._check()
+        deadline = self._deadline()
+        while not self.received:
+            self._handle_events(deadline)
+        return self.received.popleft()
+
+    def close(self):
+        # let the submitted OUT reports go out
+        while (
+            len(self.free_out_transfers) < OUT_TRANSFERS
+            and self.error is None
+            and self.dead is None
+        ):
+            self.context.handleEventsTimeout(EVENT_TIMEOUT)
+        self.closing = True
+        for transfer in self.in_transfers:
+            if transfer.isSubmitted():
+                try:
+                    transfer.cancel()
+                except usb1.USBErrorNotFound:
+                    pass
+        while any(transfer.isSubmitted() for transfer in self.in_transfers):
+            self.context.handleEventsTimeout(EVENT_TIMEOUT)
+        for transfer in self.in_transfers + self.out_transfers:
+            transfer.close()
+
 
 class WebUsbHandle:
     def __init__(self, device):
         self.device = device
         self.count = 0
         self.handle = None
+        self.transfers = None  # AsyncTransfers, in asynchronous mode
 
     def open(self, interface):
         if self.count == 0:
@@ -56,6 +194,9 @@ class WebUsbHandle:
 
     def close(self, interface):
         if self.count == 1:
+            if self.transfers is not None:
+                self.transfers.close()
+                self.transfers = None
             self.handle.releaseInterface(interface)
             self.handle.close()
         if self.count > 0:
@@ -65,12 +206,31 @@ class WebUsbHandle:
 class WebUsbTransport(Transport):
     """
     WebUsbTransport implements transport over WebUSB interface.
+
+    With `async_transfers`, reports are exchanged through libusb asynchronous
+    transfers (see `AsyncTransfers`) instead of one synchronous transfer per
+    report.  `timeout`, in seconds, limits how long reading or writing one
+    report may take in that mode.
+
+    `context` is the libusb context that `device` belongs to.  It defaults to
+    the context of `enumerate()`, which is where devices are normally found.
     """
 
     PATH_PREFIX = "webusb"
+    PIPELINE_DEPTH = 4
     context = None
-
-    def __init__(self, device, protocol=None, handle=None, debug=False):
+    hotplug_events = None
+
+    def __init__(
+        self,
+        device,
+        protocol=None,
+        handle=None,
+        debug=False,
+        async_transfers=False,
+        timeout=None,
+        context=None,
+    ):
         super(WebUsbTransport, self).__init__()
 
         if handle is None:
@@ -89,10 +249,44 @@ class WebUsbTransport(Transport):
         self.protocol = protocol
         self.handle = handle
         self.debug = debug
+        self.async_transfers = async_transfers
+        self.timeout = timeout
+        if context is not None:
+            self.context = context
 
     def get_path(self):
         return "%s:%s" % (self.PATH_PREFIX, dev_to_str(self.device))
 
+    def get_serial_number(self):
+        return self.device.getSerialNumber()
+
+    @classmethod
+    def _hotplug_callback(cls, context, device, event):
+        if is_trezor1(device) or is_trezor2(device) or is_trezor2_bl(device):
+            cls.hotplug_events.append(event)
+        return False
+
+    @classmethod
+    def wait_for_changes(cls, devices, timeout):
+        if not usb1.hasCapability(usb1.CAP_HAS_HOTPLUG):
+            raise NotImplementedError
+        if cls.context is None:
+            cls.enumerate()
+        if cls.hotplug_events is None:
+            cls.hotplug_events = []
+            # flags=0: no events for the devices that are already connected
+            cls.context.hotplugRegisterCallback(cls._hotplug_callback, flags=0)
+        # Events are handled on the context shared with open transports, which
+        # may run transfer callbacks here; see `AsyncTransfers`.
+        deadline = time.monotonic() + timeout
+        while not cls.hotplug_events:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            cls.context.handleEventsTimeout(min(remaining, EVENT_TIMEOUT))
+        cls.hotplug_events.clear()
+        return True
+
     @classmethod
     def enumerate(cls):
         if cls.context is None:
@@ -112,7 +306,7 @@ class WebUsbTransport(Transport):
                 # a HID and a WebUSB device), and one of the returned devices is
                 # non-functional.
                 dev.getProduct()
-                devices.append(WebUsbTransport(dev))
+                devices.append(WebUsbTransport(dev, context=cls.context))
             except usb1.USBErrorNotSupported:
                 pass
         return devices
@@ -121,19 +315,30 @@ class WebUsbTransport(Transport):
         if isinstance(self.protocol, ProtocolV2):
             # TODO test this
             # For v2 protocol, lets use the same WebUSB interface, but with a different session
-            protocol = ProtocolV2()
-            debug = WebUsbTransport(self.device, protocol, self.handle)
+            protocol = ProtocolV2(demux=self.protocol.demux)
+            debug = WebUsbTransport(
+                self.device, protocol, self.handle, context=self.context
+            )
             return debug
         if isinstance(self.protocol, ProtocolV1):
             # For v1 protocol, find debug USB interface for the same serial number
             protocol = ProtocolV1()
-            debug = WebUsbTransport(self.device, protocol, None, True)
+            debug = WebUsbTransport(
+                self.device, protocol, None, True, context=self.context
+            )
             return debug
         raise TransportException("Debug WebUSB device not found")
 
     def open(self):
         interface = DEBUG_INTERFACE if self.debug else INTERFACE
         self.handle.open(interface)
+        if self.async_transfers and self.handle.transfers is None:
+            if self.context is None:
+                raise TransportException("No libusb context for asynchronous transfers")
+            endpoint = DEBUG_ENDPOINT if self.debug else ENDPOINT
+            self.handle.transfers = AsyncTransfers(
+                self.context, self.handle.handle, endpoint, self.timeout
+            )
         self.protocol.session_begin(self)
 
     def close(self):
@@ -151,13 +356,19 @@ class WebUsbTransport(Transport):
         endpoint = DEBUG_ENDPOINT if self.debug else ENDPOINT
         if len(chunk) != 64:
             raise TransportException("Unexpected chunk size: %d" % len(chunk))
-        self.handle.handle.interruptWrite(endpoint, chunk)
+        if self.handle.transfers is not None:
+            self.handle.transfers.write(chunk)
+        else:
+            self.handle.handle.interruptWrite(endpoint, chunk)
 
     def read_chunk(self):
         endpoint = DEBUG_ENDPOINT if self.debug else ENDPOINT
         endpoint = 0x80 | endpoint
         while True:
-            chunk = self.handle.handle.interruptRead(endpoint, 64)
+            if self.handle.transfers is not None:
+                chunk = self.handle.transfers.read()
+            else:
+                chunk = self.handle.handle.interruptRead(endpoint, 64)
             if chunk:
                 break
             else:
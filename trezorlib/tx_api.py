@@ -126,15 +126,9 @@ class TxApiInsight(TxApi):
         for vout in data["vout"]:
             o = t._add_bin_outputs()
             o.amount = int(Decimal(vout["value"]) * 100000000)
+            # bip115 replay protection (OP_CHECKBLOCKATHEIGHT) is part of
+            # script_pubkey itself; TxOutputBinType has no separate fields for it
             o.script_pubkey = bytes.fromhex(vout["scriptPubKey"]["hex"])
-            if self.bip115 and o.script_pubkey[-1] == 0xB4:
-                # Verify if coin implements replay protection bip115 and script includes checkblockatheight opcode. 0xb4 - is op_code (OP_CHECKBLOCKATHEIGHT)
-                # <OP_32> <32-byte block hash> <OP_3> <3-byte block height> <OP_CHECKBLOCKATHEIGHT>
-                tail = o.script_pubkey[-38:]
-                o.block_hash = tail[1:33]  # <32-byte block hash>
-                o.block_height = int.from_bytes(
-                    tail[34:37], byteorder="little"
-                )  # <3-byte block height>
             if self.decred:
                 o.decred_script_version = vout["version"]
 